@@ -1,3 +1,5 @@
+from typing import Any, Dict, List, Literal, Optional
+
 from pydantic import BaseModel
 
 class PDFSuccessResponse(BaseModel):
@@ -17,5 +19,46 @@ class ChatResponse(BaseModel):
     status: str = "success"
     llm_reply: str
 
+class JobResponse(BaseModel):
+    job_id: str
+    operation: Literal["summarize", "chat"]
+    pdf_name: str
+    status: Literal["queued", "running", "completed", "failed"]
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+class BatchResponse(BaseModel):
+    batch_id: str
+    status: Literal["queued", "running", "completed", "failed"]
+    documents_total: int
+    documents_done: int = 0
+    documents_failed: int = 0
+    chunks_created: int = 0
+    chunks_stored: int = 0
+    elapsed_seconds: float = 0.0
+    documents_per_second: float = 0.0
+    chunks_per_second: float = 0.0
+    embedding_seconds: float = 0.0
+    documents: List[Dict[str, Any]] = []
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
 
+class TableCell(BaseModel):
+    commodity: str
+    region: str
+    marketing_year: str
+    attribute: str
+    variant: str
+    unit: str
+    value: float
+    page: int
 
+class TableAnswerResponse(BaseModel):
+    status: str = "success"
+    answer: str
+    filters: Dict[str, Optional[str]]
+    results: List[TableCell]
@@ -0,0 +1,53 @@
+from typing import List
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import Form
+
+from app.pydantics.models import BatchResponse
+from app.services.batch_service import BatchService
+from app.services.service_registry import registry
+
+
+async def get_batch_service():
+    await registry.wait_until_ready()
+    return registry.batch_service
+
+
+batch_router = APIRouter()
+
+
+@batch_router.post("/batches", response_model=BatchResponse, status_code=202)
+async def submit_batch(
+        files: List[UploadFile] | None = File(None),
+        directory: str | None = Form(None),
+        batch_service: BatchService = Depends(get_batch_service),
+):
+    """Ingest many PDFs for chat, uploaded or from a server directory, and return the batch id immediately"""
+    if bool(files) == bool(directory):
+        raise HTTPException(status_code=400, detail="Send either files or a directory")
+    if files:
+        return batch_service.submit_files(files)
+    try:
+        return batch_service.submit_directory(directory)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@batch_router.get("/batches", response_model=List[BatchResponse])
+async def list_batches(
+        limit: int = 50,
+        batch_service: BatchService = Depends(get_batch_service),
+):
+    return batch_service.list_batches(limit)
+
+
+@batch_router.get("/batches/{batch_id}", response_model=BatchResponse)
+async def get_batch(
+        batch_id: str,
+        batch_service: BatchService = Depends(get_batch_service),
+):
+    """Progress, per-document results and throughput of a batch"""
+    batch = batch_service.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch not found: {batch_id}")
+    return batch
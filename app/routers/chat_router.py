@@ -1,11 +1,19 @@
+import logging
+
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 
 from app.pydantics.models import ChatPayload
+from app.routers.streaming import SSE_HEADERS, sse_event
 from app.services.llm_service import LLMService
+from app.services.service_registry import registry
 from app.templates.prompt_template import OperationType
 
-def get_llm_service():
-    return LLMService()
+logger = logging.getLogger(__name__)
+
+async def get_llm_service():
+    await registry.wait_until_ready()
+    return registry.llm_service
 
 
 chat_router = APIRouter()
@@ -21,3 +29,22 @@ async def setup_chat(
     except Exception as e:
         raise e
 
+
+@chat_router.post("/chat/stream")
+async def stream_chat(
+        chat_data: ChatPayload = ChatPayload,
+        llm_service: LLMService = Depends(get_llm_service)
+):
+    """Server-sent events: one "token" event per delta, then "done" with the full reply"""
+    async def event_stream():
+        reply = []
+        try:
+            async for delta in llm_service.stream_chat(chat_data.query, chat_data.file_name):
+                reply.append(delta)
+                yield sse_event("token", {"delta": delta})
+            yield sse_event("done", {"status": "success", "llm_reply": "".join(reply)})
+        except Exception as e:
+            logger.error(f"Error in stream_chat: {str(e)}")
+            yield sse_event("error", {"status": "error", "error": str(e)})
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
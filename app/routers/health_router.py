@@ -3,17 +3,21 @@ from fastapi.responses import JSONResponse
 from datetime import datetime, timezone
 import logging
 
+from app.services.service_registry import registry
+
 health_router = APIRouter()
 
 @health_router.get("/health")
 async def health_check():
-    """To check the API server running status"""
+    """To check the API server is alive (it may still be warming up, see "ready")"""
     try:
         return JSONResponse(
             content={
                 "status": "ok",
+                "alive": True,
                 "timestamp": datetime.now(timezone.utc).isoformat(),
-                "message": "API server is up and healthy"
+                "message": "API server is up and healthy",
+                **registry.status()
             },
             status_code=200
         )
@@ -27,3 +31,23 @@ async def health_check():
             },
             status_code=500
         )
+
+
+@health_router.get("/health/ready")
+async def readiness_check():
+    """To check the shared services are loaded and requests can be served"""
+    status = registry.status()
+    if status["ready"]:
+        state = "ready"
+    elif status["warmup_error"]:
+        state = "failed"
+    else:
+        state = "warming_up"
+    return JSONResponse(
+        content={
+            "status": state,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **status
+        },
+        status_code=200 if status["ready"] else 503
+    )
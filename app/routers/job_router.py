@@ -0,0 +1,47 @@
+from typing import List, Literal
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import Form
+
+from app.pydantics.models import JobResponse
+from app.services.job_service import JobService
+from app.services.service_registry import registry
+
+
+async def get_job_service():
+    await registry.wait_until_ready()
+    return registry.job_service
+
+
+job_router = APIRouter()
+
+
+@job_router.post("/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(
+        file: UploadFile = File(...),
+        operation: Literal["summarize", "chat"] = Form("chat"),
+        job_service: JobService = Depends(get_job_service),
+):
+    """Queue a PDF for summarization or vectorization and return its job id immediately"""
+    return job_service.submit(file, operation)
+
+
+@job_router.get("/jobs", response_model=List[JobResponse])
+async def list_jobs(
+        status: Literal["queued", "running", "completed", "failed"] | None = None,
+        limit: int = 50,
+        job_service: JobService = Depends(get_job_service),
+):
+    return job_service.list_jobs(status, limit)
+
+
+@job_router.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(
+        job_id: str,
+        job_service: JobService = Depends(get_job_service),
+):
+    """Status, per-part progress and result of a job"""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
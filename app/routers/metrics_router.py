@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.services.metrics_service import metrics
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics of the pipeline stages, LLM calls, caches and HTTP requests"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
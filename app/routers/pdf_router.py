@@ -1,23 +1,39 @@
-from typing import Literal
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Literal
 
 from fastapi import APIRouter, UploadFile, File, Depends
 from fastapi import Form
+from fastapi.responses import StreamingResponse
 
+from app.pydantics.models import PDFErrorResponse
+from app.routers.streaming import SSE_HEADERS, sse_event
+from app.services.incremental_service import IncrementalService
 from app.services.llm_service import LLMService
 from app.services.pdf_service import PDFService
+from app.services.service_registry import registry
 from app.services.vector_service import VectorService
 
 
-def get_pdf_service():
-    return PDFService()
+async def get_pdf_service():
+    await registry.wait_until_ready()
+    return registry.pdf_service
 
 
-def get_llm_service():
-    return LLMService()
+async def get_llm_service():
+    await registry.wait_until_ready()
+    return registry.llm_service
 
-def get_vector_service():
-    return VectorService()
+async def get_vector_service():
+    await registry.wait_until_ready()
+    return registry.vector_service
 
+async def get_incremental_service():
+    await registry.wait_until_ready()
+    return registry.incremental_service
+
+
+logger = logging.getLogger(__name__)
 
 pdf_router = APIRouter()
 
@@ -26,18 +42,43 @@ pdf_router = APIRouter()
 async def upload_and_summarize(
         file: UploadFile = File(...),
         operation: Literal["summarize", "chat"] = Form("chat"),
+        stream: bool = Form(False),
+        incremental: bool = Form(False),
+        series: str | None = Form(None),
         pdf_service: PDFService = Depends(get_pdf_service),
+        llm_service: LLMService = Depends(get_llm_service),
+        vector_service: VectorService = Depends(get_vector_service),
+        incremental_service: IncrementalService = Depends(get_incremental_service),
 ):
     try:
-        result = pdf_service.process_pdf(file)
+        if operation == "chat":
+            # Extracted pages flow straight into chunking and embedding, no part files round trip
+            def vectorize():
+                with pdf_service.extract_pages(file) as (pdf_data, pages):
+                    if incremental:
+                        return incremental_service.vectorize_pages(pdf_data, pages, series)
+                    return vector_service.vectorize_pages(pdf_data, pages)
+
+            try:
+                # Extraction, embedding and storage block, so they run off the event loop
+                return await asyncio.to_thread(vectorize)
+            except Exception as e:
+                return PDFErrorResponse(error=f"Error occurred while extracting the text from the PDF: {str(e)}")
+
+        result = await asyncio.to_thread(pdf_service.process_pdf, file)
         if result.status == "success":
-            if operation == "summarize":
-                llm_service = get_llm_service()
-                llm_response = await llm_service.summarize_nudge(result.pdf_filename)
-                return llm_response
-            vector_service = get_vector_service()
-            vector_response = vector_service.vectorize_nudge(result)
-            return vector_response
+            if stream:
+                events = (incremental_service.iter_summarize(result.pdf_filename, result.total_pages, series)
+                          if incremental else llm_service.iter_summarize(result.pdf_filename, result.total_pages))
+                return StreamingResponse(
+                    stream_summary(events, result.pdf_filename, result.total_pages),
+                    media_type="text/event-stream",
+                    headers=SSE_HEADERS
+                )
+            if incremental:
+                return await incremental_service.summarize(result.pdf_filename, result.total_pages, series)
+            llm_response = await llm_service.summarize_nudge(result.pdf_filename)
+            return llm_response
         else:
             return result
 
@@ -45,4 +86,12 @@ async def upload_and_summarize(
         raise e
 
 
-
+async def stream_summary(events: AsyncIterator[Dict[str, Any]], pdf_name: str, total_pages: int):
+    """Server-sent events: "extracted", one "part" per part summary as it completes, then "final" """
+    yield sse_event("extracted", {"pdf_name": pdf_name, "total_pages": total_pages})
+    try:
+        async for event in events:
+            yield sse_event(event.pop("event"), event)
+    except Exception as e:
+        logger.error(f"Error in stream_summary: {str(e)}")
+        yield sse_event("error", {"success": False, "error": str(e)})
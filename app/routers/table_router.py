@@ -0,0 +1,43 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.pydantics.models import ChatPayload, TableAnswerResponse, TableCell
+from app.services.service_registry import registry
+from app.services.table_service import TableService
+
+
+async def get_table_service():
+    await registry.wait_until_ready()
+    return registry.table_service
+
+
+table_router = APIRouter()
+
+
+@table_router.post("/tables/query", response_model=TableAnswerResponse)
+async def query_tables(
+        query_data: ChatPayload = ChatPayload,
+        table_service: TableService = Depends(get_table_service)
+):
+    """Answer a direct numeric question from the extracted tables, without calling the LLM"""
+    result = table_service.answer(query_data.file_name, query_data.query)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return TableAnswerResponse(answer=result["answer"], filters=result["filters"], results=result["results"])
+
+
+@table_router.get("/tables/{pdf_name}", response_model=List[TableCell])
+async def lookup_table(
+        pdf_name: str,
+        commodity: str | None = None,
+        region: str | None = None,
+        marketing_year: str | None = None,
+        attribute: str | None = None,
+        variant: str | None = None,
+        table_service: TableService = Depends(get_table_service)
+):
+    """Table cells of a document filtered by commodity, region, marketing year, attribute and variant"""
+    if table_service.get_table(pdf_name) is None:
+        raise HTTPException(status_code=404, detail=f"No tables extracted for {pdf_name}")
+    return table_service.lookup(pdf_name, commodity, region, marketing_year, attribute, variant)
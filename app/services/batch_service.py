@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.pydantics.models import BatchResponse, PDFSuccessResponse
+from app.services.pdf_service import PDFService, SPOOL_CHUNK_SIZE
+from app.services.vector_service import VectorService
+
+logger = logging.getLogger(__name__)
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+BATCH_PREFETCH_DOCUMENTS = int(os.getenv("BATCH_PREFETCH_DOCUMENTS", "0"))  # 0: twice the workers
+BATCH_EMBED_TEXTS = int(os.getenv("BATCH_EMBED_TEXTS", "256"))  # Chunk texts per embedding call, across documents
+BATCH_INGEST_ROOT = os.getenv("BATCH_INGEST_ROOT", "")  # Server directory batches may read; empty disables it
+
+Source = Tuple[str, str]  # (pdf_name, pdf_path)
+
+
+class BatchService:
+    """
+    Ingests many PDFs for chat as one pipelined job
+
+    Documents are extracted (one worker process each) and chunked ahead of the
+    embedding stage by a pool of prefetch threads. New chunks of consecutive
+    documents are embedded together in calls of embed_texts texts, across
+    document boundaries, and a storage thread writes each document to its
+    collection while the next chunks are embedded. Batches are kept in memory;
+    since chunk ids are content hashes, resubmitting an interrupted batch only
+    embeds what is missing.
+    """
+
+    def __init__(self, pdf_service: PDFService, vector_service: VectorService, workers: int = BATCH_WORKERS,
+                 prefetch_documents: int = BATCH_PREFETCH_DOCUMENTS, embed_texts: int = BATCH_EMBED_TEXTS,
+                 ingest_root: str = BATCH_INGEST_ROOT):
+        self.pdf_service = pdf_service
+        self.vector_service = vector_service
+        self.workers = max(1, workers)
+        self.prefetch_documents = prefetch_documents or self.workers * 2
+        self.embed_texts = max(1, embed_texts)
+        self.ingest_root = ingest_root
+        self.batches_dir = "app/utils/batches"
+        os.makedirs(self.batches_dir, exist_ok=True)
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = threading.Event()
+
+    def submit_files(self, files) -> BatchResponse:
+        """
+        Spool the uploads to disk and start ingesting them
+
+        Args:
+            files: FastAPI UploadFile objects
+
+        Returns:
+            The queued batch
+        """
+        batch_id = uuid.uuid4().hex
+        batch_dir = os.path.join(self.batches_dir, batch_id)
+        os.makedirs(batch_dir, exist_ok=True)
+        sources = []
+        for index, file in enumerate(files):
+            pdf_name = os.path.splitext(os.path.basename(file.filename or f"document_{index + 1}"))[0]
+            pdf_path = os.path.join(batch_dir, f"{index:05d}.pdf")
+            with open(pdf_path, 'wb') as f:
+                shutil.copyfileobj(file.file, f, SPOOL_CHUNK_SIZE)
+            sources.append((pdf_name, pdf_path))
+        return self._start(batch_id, sources, cleanup_dir=batch_dir)
+
+    def submit_directory(self, directory: str) -> BatchResponse:
+        """
+        Start ingesting every PDF under a directory of BATCH_INGEST_ROOT
+
+        Args:
+            directory: Directory relative to the ingest root
+
+        Returns:
+            The queued batch
+
+        Raises:
+            ValueError: Directory ingestion is disabled, or the directory is outside the root or has no PDFs
+        """
+        if not self.ingest_root:
+            raise ValueError("Directory ingestion is disabled; set BATCH_INGEST_ROOT")
+        root = os.path.realpath(self.ingest_root)
+        path = os.path.realpath(os.path.join(root, directory))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError(f"Directory is outside BATCH_INGEST_ROOT: {directory}")
+        if not os.path.isdir(path):
+            raise ValueError(f"Directory not found: {directory}")
+
+        sources = []
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.lower().endswith(".pdf"):
+                    sources.append((os.path.splitext(file_name)[0], os.path.join(dir_path, file_name)))
+        if not sources:
+            raise ValueError(f"No PDF files found in: {directory}")
+        return self._start(uuid.uuid4().hex, sources)
+
+    def get(self, batch_id: str) -> Optional[BatchResponse]:
+        """Current state of a batch, or None if it does not exist"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+            return BatchResponse(**batch) if batch else None
+
+    def list_batches(self, limit: int = 50) -> List[BatchResponse]:
+        """Most recent batches"""
+        with self._lock:
+            batches = sorted(self._batches.values(), key=lambda batch: batch["created_at"], reverse=True)[:limit]
+            return [BatchResponse(**batch) for batch in batches]
+
+    async def stop(self):
+        """Stop taking new documents and wait for the ones in flight"""
+        self._stopping.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _start(self, batch_id: str, sources: List[Source], cleanup_dir: str | None = None) -> BatchResponse:
+        now = time.time()
+        with self._lock:
+            self._batches[batch_id] = {
+                "batch_id": batch_id,
+                "status": "queued",
+                "documents_total": len(sources),
+                "documents": [],
+                "created_at": now,
+                "updated_at": now
+            }
+        task = asyncio.create_task(self._run(batch_id, sources, cleanup_dir))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self.get(batch_id)
+
+    async def _run(self, batch_id: str, sources: List[Source], cleanup_dir: str | None):
+        """Run the pipeline in a worker thread and record its outcome"""
+        self._update(batch_id, status="running")
+        started = time.perf_counter()
+
+        def on_document(result: Dict[str, Any]):
+            with self._lock:
+                batch = self._batches[batch_id]
+                batch["documents"].append(result)
+                self._apply_totals(batch, batch["documents"], time.perf_counter() - started)
+
+        try:
+            summary = await asyncio.to_thread(self.ingest, sources, on_document)
+            error = None
+            if summary["documents_done"] + summary["documents_failed"] < len(sources):
+                error = "Stopped before every document was ingested; resubmit to ingest the rest"
+            elif summary["documents_failed"] == len(sources):
+                error = "No document could be ingested"
+            self._update(batch_id, status="failed" if error else "completed", error=error,
+                         embedding_seconds=summary["embedding_seconds"])
+        except Exception as e:
+            logger.error(f"Error in batch {batch_id}: {str(e)}")
+            self._update(batch_id, status="failed", error=str(e))
+        finally:
+            if cleanup_dir:
+                shutil.rmtree(cleanup_dir, ignore_errors=True)
+
+    def _update(self, batch_id: str, **fields: Any):
+        with self._lock:
+            self._batches[batch_id].update(fields, updated_at=time.time())
+
+    @staticmethod
+    def _apply_totals(batch: Dict[str, Any], documents: List[Dict[str, Any]], elapsed: float):
+        """Document and chunk counts of the finished documents, and the throughput so far"""
+        succeeded = [document for document in documents if document.get("status") == "success"]
+        batch["documents_done"] = len(succeeded)
+        batch["documents_failed"] = len(documents) - len(succeeded)
+        batch["chunks_created"] = sum(document["chunks_created"] for document in succeeded)
+        batch["chunks_stored"] = sum(document["chunks_stored"] for document in succeeded)
+        batch["elapsed_seconds"] = round(elapsed, 3)
+        batch["documents_per_second"] = round(len(succeeded) / elapsed, 3) if elapsed else 0.0
+        batch["chunks_per_second"] = round(batch["chunks_created"] / elapsed, 1) if elapsed else 0.0
+        batch["updated_at"] = time.time()
+
+    def ingest(self, sources: List[Source],
+               on_document: Callable[[Dict[str, Any]], None] | None = None) -> Dict[str, Any]:
+        """
+        Extract, chunk, embed and store many PDFs as one pipeline
+
+        Args:
+            sources: (pdf_name, pdf_path) of each document
+            on_document: Called with each document's result as soon as it is stored
+
+        Returns:
+            Per-document results, totals and throughput (documents/s, chunks/s)
+        """
+        started = time.perf_counter()
+        embedding_seconds, embedding_calls = 0.0, 0
+        waiting = deque()  # Prepared documents, in order, until their new chunks are embedded
+        pending: List[Tuple[Dict[str, Any], str]] = []  # (document, chunk text) to embed, across documents
+
+        def embed(count: int):
+            nonlocal embedding_seconds, embedding_calls
+            texts = [text for _, text in pending[:count]]
+            embedding_started = time.perf_counter()
+            embeddings = self.vector_service.get_text_embeddings(texts)
+            embedding_seconds += time.perf_counter() - embedding_started
+            embedding_calls += 1
+            for (document, text), embedding in zip(pending[:count], embeddings):
+                document["embeddings"][text] = embedding
+            del pending[:count]
+
+        def flush_ready():
+            while waiting and len(waiting[0]["embeddings"]) == waiting[0]["new_chunks"]:
+                stores.append(store_pool.submit(self._store, waiting.popleft(), on_document))
+
+        names = set()
+
+        def prepare(pdf_name: str, pdf_path: str) -> Future:
+            # Documents share a collection by name: a second one would replace the first's chunks as stale
+            if pdf_name in names:
+                duplicate = Future()
+                duplicate.set_result({"pdf_name": pdf_name, "pdf_data": None, "chunks": [], "embeddings": {},
+                                      "error": f"Another document of the batch is named {pdf_name}"})
+                return duplicate
+            names.add(pdf_name)
+            return prepare_pool.submit(self._prepare, pdf_name, pdf_path)
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="batch-prepare") as prepare_pool, \
+                ThreadPoolExecutor(1, thread_name_prefix="batch-store") as store_pool:
+            source_iterator = iter(sources)
+            prepared = deque(prepare(*source) for source in islice(source_iterator, self.prefetch_documents))
+            stores = []
+            while prepared:
+                document = prepared.popleft().result()
+                next_source = None if self._stopping.is_set() else next(source_iterator, None)
+                if next_source is not None:
+                    prepared.append(prepare(*next_source))
+
+                new_texts = []
+                if document["error"] is None:
+                    try:
+                        new_texts = self.vector_service.new_chunk_texts(document["pdf_name"], document["chunks"])
+                    except Exception as e:
+                        document["error"] = str(e)
+                document["new_chunks"] = len(new_texts)
+                waiting.append(document)
+                pending.extend((document, text) for text in new_texts)
+                while len(pending) >= self.embed_texts:
+                    embed(self.embed_texts)
+                    flush_ready()
+                flush_ready()
+
+            if pending:
+                embed(len(pending))
+            flush_ready()
+            results = [store.result() for store in stores]
+
+        elapsed = time.perf_counter() - started
+        summary = {"documents": results, "embedding_seconds": round(embedding_seconds, 3),
+                   "embedding_calls": embedding_calls}
+        self._apply_totals(summary, results, elapsed)
+        summary.pop("updated_at")
+        return summary
+
+    def _prepare(self, pdf_name: str, pdf_path: str) -> Dict[str, Any]:
+        """Extract and chunk one document (runs in a prefetch thread)"""
+        document = {"pdf_name": pdf_name, "pdf_data": None, "chunks": [], "embeddings": {}, "error": None}
+        try:
+            prepare_started = time.perf_counter()
+            pages = self.pdf_service.read_pages_in_process(pdf_path, self.workers)
+            pdf_data, pages = self.pdf_service.open_pages(pdf_path, pdf_name, write_parts=False, pages=pages)
+            document["pdf_data"] = pdf_data
+            document["chunks"] = list(self.vector_service.chunk_pages(pages))
+            document["prepare_seconds"] = round(time.perf_counter() - prepare_started, 4)
+        except Exception as e:
+            logger.error(f"Error preparing {pdf_name}: {str(e)}")
+            document["error"] = f"Error occurred while extracting the text from the PDF: {str(e)}"
+        return document
+
+    def _store(self, document: Dict[str, Any], on_document: Callable[[Dict[str, Any]], None] | None) -> Dict[str, Any]:
+        """Write one embedded document to its collection (runs in the storage thread)"""
+        pdf_data: PDFSuccessResponse = document["pdf_data"]
+        if document["error"] is not None:
+            result = {"status": "error", "pdf_name": document["pdf_name"], "error": document["error"]}
+        else:
+            try:
+                result = self.vector_service.store_chunks(pdf_data, document["chunks"], document["embeddings"])
+                result["timings"]["prepare_seconds"] = document["prepare_seconds"]
+                # Cache counters are process-wide; the batch reports them once, not per document
+                result.pop("embedding_cache", None)
+                result.pop("retrieval_cache", None)
+            except Exception as e:
+                logger.error(f"Error storing {document['pdf_name']}: {str(e)}")
+                result = {"status": "error", "pdf_name": document["pdf_name"], "error": str(e)}
+        # The chunks and embeddings are no longer needed once stored
+        document.clear()
+        if on_document is not None:
+            on_document(result)
+        return result
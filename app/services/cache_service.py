@@ -0,0 +1,352 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "512"))
+
+
+class SummaryCache:
+    """Persistent, content-addressed cache of LLM summaries"""
+
+    def __init__(self, cache_dir: str = "app/utils/summary_cache", max_entries: int = SUMMARY_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(input_content: str, prompt: str, model: str) -> str:
+        """
+        Build the cache key for a summary request
+
+        Args:
+            input_content: Text sent as the user message (part text or grouped summary)
+            prompt: System prompt of the OperationType
+            model: Name of the LLM model
+
+        Returns:
+            Hex digest identifying the request
+        """
+        digest = hashlib.sha256()
+        for value in (model, prompt, input_content):
+            digest.update(value.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key: str) -> str | None:
+        """Return the cached summary for the key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                summary = f.read()
+            os.utime(path)  # Mark as recently used for eviction
+            return summary
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading summary cache entry {key}: {str(e)}")
+            return None
+
+    def set(self, key: str, summary: str):
+        """Store a summary under the key and evict the least recently used entries"""
+        try:
+            tmp_path = f"{self._path(key)}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(summary)
+            os.replace(tmp_path, self._path(key))
+            self._evict()
+        except Exception as e:
+            logger.error(f"Error writing summary cache entry {key}: {str(e)}")
+
+    def _evict(self):
+        """Remove the least recently used entries beyond max_entries"""
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".txt")]
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:overflow]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+
+
+EMBEDDING_CACHE_LRU_SIZE = int(os.getenv("EMBEDDING_CACHE_LRU_SIZE", "4096"))
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by text hash and embedding model name.
+
+    Vectors are appended to a flat float32 file that is read back through a
+    memory map; keys.txt holds one key per row of that file. Recently used
+    vectors are also kept in an in-memory LRU in front of the memory map.
+
+    Several processes (e.g. server workers) may share the directory: appends
+    and repairs hold an exclusive lock on the lock file, rows are numbered by
+    their line in keys.txt and each process reads the keys appended by the
+    others. Without fcntl (Windows) only a single process may use a directory.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = "app/utils/embedding_cache",
+                 lru_size: int = EMBEDDING_CACHE_LRU_SIZE):
+        self.model_name = model_name or ""
+        self.cache_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9._-]+", "_", self.model_name) or "default")
+        self.vectors_path = os.path.join(self.cache_dir, "vectors.f32")
+        self.keys_path = os.path.join(self.cache_dir, "keys.txt")
+        self.dim_path = os.path.join(self.cache_dir, "dim.txt")
+        self.lock_path = os.path.join(self.cache_dir, "lock")
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()
+        self._rows = {}
+        self._row_count = 0  # Rows indexed so far; a key written twice by two processes keeps its first row
+        self._keys_offset = 0  # Bytes of keys.txt indexed so far
+        self._dim = None
+        self._mmap = None
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool = True):
+        """Lock shared by every process using the cache directory"""
+        with open(self.lock_path, 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _load_index(self):
+        """Load the key -> row index and drop any partially written tail rows"""
+        with self._lock, self._file_lock():
+            self._sync_index()
+            self._repair()
+
+    def _sync_index(self):
+        """Index the keys appended to keys.txt since the last sync, by this or another process"""
+        if self._dim is None:
+            if not os.path.exists(self.dim_path):
+                return
+            with open(self.dim_path, 'r', encoding='utf-8') as f:
+                self._dim = int(f.read().strip())
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self._keys_offset)
+            appended = f.read()
+        vector_rows = os.path.getsize(self.vectors_path) // (self._dim * 4) if os.path.exists(self.vectors_path) else 0
+        # The last piece has no newline yet: a write in progress elsewhere, or an interrupted one
+        for line in appended.split(b"\n")[:-1]:
+            key = line.decode("utf-8", errors="replace").strip()
+            if len(key) != 64 or self._row_count >= vector_rows:
+                break
+            self._rows.setdefault(key, self._row_count)
+            self._row_count += 1
+            self._keys_offset += len(line) + 1
+
+    def _repair(self):
+        """Cut both files back to the indexed rows (only under the exclusive file lock)"""
+        if self._dim is None:
+            return
+        for path, size in ((self.keys_path, self._keys_offset), (self.vectors_path, self._row_count * self._dim * 4)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def make_key(self, text: str) -> str:
+        """Hash of the embedding model name and the text"""
+        digest = hashlib.sha256()
+        digest.update(self.model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _disk_vector(self, row: int) -> np.ndarray:
+        if self._mmap is None or row >= self._mmap.shape[0]:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                   shape=(self._row_count, self._dim))
+        return np.array(self._mmap[row])
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            One cached vector per text, or None where the text is not cached
+        """
+        results = []
+        with self._lock:
+            # Pick up the vectors other processes cached since the last lookup
+            if os.path.exists(self.keys_path) and os.path.getsize(self.keys_path) > self._keys_offset:
+                with self._file_lock(exclusive=False):
+                    self._sync_index()
+            for text in texts:
+                key = self.make_key(text)
+                vector = self._lru.get(key)
+                if vector is None and key in self._rows:
+                    vector = self._disk_vector(self._rows[key])
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._remember(key, vector)
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]] | np.ndarray):
+        """Persist embeddings for texts that are not cached yet"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or not len(vectors):
+            return
+        with self._lock, self._file_lock():
+            self._sync_index()
+            self._repair()
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                with open(self.dim_path, 'w', encoding='utf-8') as f:
+                    f.write(str(self._dim))
+            if vectors.shape[1] != self._dim:
+                logger.error(f"Embedding dimension changed for {self.model_name}, not caching")
+                return
+            new_keys, new_rows = [], []
+            for text, vector in zip(texts, vectors):
+                key = self.make_key(text)
+                self._remember(key, vector)
+                if key in self._rows or key in new_keys:
+                    continue
+                new_keys.append(key)
+                new_rows.append(vector)
+            if not new_keys:
+                return
+            try:
+                # Vectors are written before keys so an interrupted write never indexes a missing row
+                with open(self.vectors_path, 'ab') as f:
+                    f.write(np.stack(new_rows).tobytes())
+                keys = "".join(f"{key}\n" for key in new_keys).encode("utf-8")
+                with open(self.keys_path, 'ab') as f:
+                    f.write(keys)
+                for key in new_keys:
+                    self._rows[key] = self._row_count
+                    self._row_count += 1
+                self._keys_offset += len(keys)
+            except Exception as e:
+                logger.error(f"Error writing embedding cache: {str(e)}")
+                self._repair()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._rows)
+        }
+
+
+RETRIEVAL_CACHE_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_THRESHOLD", "0.95"))
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "256"))
+
+
+class RetrievalCache:
+    """
+    Semantic cache of search results.
+
+    A query reuses the cached results of an earlier query on the same document
+    when the cosine similarity of their embeddings is at least the threshold.
+    """
+
+    def __init__(self, threshold: float = RETRIEVAL_CACHE_THRESHOLD, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._scopes: Dict[Any, OrderedDict] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, pdf_name: Optional[str], top_k: int, embedding: List[float], mode: str = "vector") -> Optional[Dict[str, Any]]:
+        """
+        Cached results of the most similar earlier query, if similar enough
+
+        Args:
+            pdf_name: Document the search is scoped to (None for all documents)
+            top_k: Number of results requested
+            embedding: Embedding of the query
+            mode: Search mode the results were produced with
+
+        Returns:
+            Cached ChromaDB query results, or None on a miss
+        """
+        with self._lock:
+            entries = self._scopes.get((pdf_name, top_k, mode))
+            if entries:
+                keys = list(entries)
+                matrix = np.stack([entries[key][0] for key in keys])
+                similarities = matrix @ self._normalize(embedding)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    entries.move_to_end(keys[best])
+                    return entries[keys[best]][1]
+            self.misses += 1
+            return None
+
+    def set(self, pdf_name: Optional[str], top_k: int, query: str, embedding: List[float], results: Dict[str, Any],
+            mode: str = "vector"):
+        """Remember the results of a query"""
+        with self._lock:
+            entries = self._scopes.setdefault((pdf_name, top_k, mode), OrderedDict())
+            entries[query] = (self._normalize(embedding), results)
+            entries.move_to_end(query)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def invalidate(self, pdf_name: Optional[str] = None):
+        """Drop cached results that may include chunks of the document (all of them when pdf_name is None)"""
+        with self._lock:
+            for scope in list(self._scopes):
+                if pdf_name is None or scope[0] in (pdf_name, None):
+                    del self._scopes[scope]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the cache"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": sum(len(entries) for entries in self._scopes.values())
+        }
@@ -1,13 +1,19 @@
 import textwrap
 from collections import OrderedDict
+from typing import List, Tuple
 
+from app.services.prompt_service import PromptPacker
 from app.services.vector_service import VectorService
 from app.templates.prompt_template import OperationType
 
-vector_service = VectorService()
 
 class ChatService:
-    def __init__(self):
+    def __init__(self, vector_service: VectorService, pdf_name: str | None = None,
+                 prompt_packer: PromptPacker | None = None):
+        self.vector_service = vector_service
+        self.pdf_name = pdf_name
+        self.prompt_packer = prompt_packer or PromptPacker("gpt-4o-mini")
+        self.last_prompt_stats = {}
         self.memory = OrderedDict()
         self.query_count = 0
         self.max_memory_size = 7  # Last 7 chat pairs
@@ -26,15 +32,16 @@ class ChatService:
             self.memory.popitem(last=False)  # Oldest user message
             self.memory.popitem(last=False)  # Oldest bot/MSP response
 
-    def get_history(self):
-        """Retrieves the conversation history and returns in a structured format"""
-        if not self.memory:
+    def get_history(self, turns: List[Tuple[str, str]] | None = None):
+        """Retrieves the conversation history (or the given turns) and returns in a structured format"""
+        turns = list(self.memory.items()) if turns is None else turns
+        if not turns:
             return "No history found for the user, as they are just started their conversation."
-        max_key_length = max(len(key) for key in self.memory)
+        max_key_length = max(len(key) for key, _ in turns)
         indent_space = max_key_length + 2
         history_str = ""
 
-        for i, (key, value) in enumerate(self.memory.items()):
+        for i, (key, value) in enumerate(turns):
             wrapped = textwrap.fill(
                 value,
                 width=130,
@@ -48,23 +55,38 @@ class ChatService:
 
 
     def get_dynamic_prompt(self, query):
-        """Generates dynamic prompt by filling the placeholder in the prompt template"""
-        history = self.get_history()
+        """
+        Generates dynamic prompt by filling the placeholder in the prompt template
+
+        History and retrieved chunks are packed into the input token budget of the
+        prompt packer: old turns are truncated and low-ranked chunks dropped first.
+        """
         prompt_template = OperationType(type="chat")
         query = self.augment_query(query)
-        semantic_finding = vector_service.semantic_search(query)
-        top_k_match = semantic_finding["results"]["documents"]
-        chat_prompt = prompt_template.dynamic_prompt(query=query, history=history, context=top_k_match)
+        semantic_finding = self.vector_service.semantic_search(query, pdf_name=self.pdf_name)
+        if not semantic_finding["success"]:
+            raise RuntimeError(f"Search failed: {semantic_finding['error']}")
+        # Results are nested per query embedding; the packer takes this query's chunks, best first
+        documents = semantic_finding["results"]["documents"]
+        top_k_match = documents[0] if documents else []
+
+        def render(packed_query, turns, context):
+            return prompt_template.dynamic_prompt(query=packed_query, history=self.get_history(turns), context=context)
+
+        chat_prompt, self.last_prompt_stats = self.prompt_packer.pack(query, list(self.memory.items()), top_k_match, render)
         return chat_prompt
 
 
     def augment_query(self, user_query):
         """Enhances the user's query by adding the context from previous bot messages."""
 
-        previous_response = self.memory.get(f"AI (response_num -> {self.query_count})")
+        # The current query is already in memory, so the previous reply has the previous number
+        previous_response = self.memory.get(f"AI (response_num -> {self.query_count - 1})")
         if len(user_query.split()) > 3 or not previous_response:
             return user_query
 
+        # Half the packer's query allowance, so the user's own words always fit after it
+        previous_response = self.prompt_packer.counter.truncate(previous_response, self.prompt_packer.query_tokens // 2)
         redefined_query = "previous_response: " + previous_response + ". user_query: " + user_query
         return redefined_query
 
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+from bisect import bisect_right
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "0"))  # 0: the embedding model's sequence limit
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "0"))  # 0: 60% of the maximum
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+DEFAULT_MAX_TOKENS = 256  # Used when no model tokenizer is available
+
+ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\ufeff"))
+# End of a sentence: terminal punctuation, optional closing quotes or brackets, then whitespace
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"')\]]*(?=\s)")
+WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Running headers that change with every issue of a report ("June 2025", "WASDE - 661 - 24")
+VOLATILE_LINE_PATTERN = re.compile(
+    r"^\s*(?:(?:January|February|March|April|May|June|July|August|September|October|November|December)\s+\d{4}"
+    r"|WASDE\s*-\s*\d+\s*-\s*\d+)\s*$",
+    re.MULTILINE | re.IGNORECASE
+)
+
+Span = Tuple[int, int]
+
+
+def normalize_text(text: str) -> str:
+    """Drop zero-width characters and collapse every run of whitespace into one space"""
+    return " ".join(text.translate(ZERO_WIDTH).split())
+
+
+def strip_volatile_lines(text: str) -> str:
+    """Page text without the running headers that differ between issues of a report"""
+    return VOLATILE_LINE_PATTERN.sub("", text)
+
+
+def page_fingerprint(text: str) -> str:
+    """Hash of a page's normalized content, equal across issues when only the running headers changed"""
+    return hashlib.sha256(normalize_text(strip_volatile_lines(text)).encode("utf-8")).hexdigest()[:24]
+
+
+def word_spans(text: str) -> List[Span]:
+    """Approximate model tokens with words and punctuation marks"""
+    return [match.span() for match in WORD_PATTERN.finditer(text)]
+
+
+def tokenizer_spans(tokenizer) -> Callable[[str], List[Span]]:
+    """
+    Character spans of the tokens a Hugging Face tokenizer produces for a text
+
+    The fast tokenizer backend is copied without truncation: the embedding model
+    enables truncation on its own backend while encoding, which would cut long texts.
+    """
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        backend = type(backend).from_str(backend.to_str())
+        backend.no_truncation()
+        backend.no_padding()
+        return lambda text: backend.encode(text, add_special_tokens=False).offsets
+    return lambda text: tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+
+class ChunkingService:
+    """
+    Splits normalized text into chunks measured in embedding-model tokens
+
+    Chunks end at a sentence boundary when one falls between min_tokens and
+    max_tokens, otherwise at max_tokens; consecutive chunks share overlap_tokens.
+    Every token of the input ends up in a chunk, including a short final one.
+    """
+
+    def __init__(self, tokenizer=None, sequence_length: Optional[int] = None, max_tokens: int = CHUNK_MAX_TOKENS,
+                 min_tokens: int = CHUNK_MIN_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        if tokenizer is not None:
+            self.token_spans = tokenizer_spans(tokenizer)
+            # The model adds its special tokens ([CLS], [SEP]) to every chunk
+            sequence_length = sequence_length or min(tokenizer.model_max_length, 100_000)
+            model_limit = sequence_length - tokenizer.num_special_tokens_to_add()
+        else:
+            self.token_spans = word_spans
+            model_limit = sequence_length or DEFAULT_MAX_TOKENS
+        self.max_tokens = min(max_tokens, model_limit) if max_tokens > 0 else model_limit
+        self.min_tokens = min(min_tokens, self.max_tokens) if min_tokens > 0 else self.max_tokens * 3 // 5
+        # A chunk can end right after min_tokens, so a larger overlap would barely advance
+        self.overlap_tokens = max(0, min(overlap_tokens, self.max_tokens // 2, self.min_tokens // 2))
+
+    @classmethod
+    def for_model(cls, model, **kwargs) -> "ChunkingService":
+        """Chunker counting the tokens of a SentenceTransformer, within its max_seq_length"""
+        return cls(tokenizer=getattr(model, "tokenizer", None), sequence_length=getattr(model, "max_seq_length", None),
+                   **kwargs)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.token_spans(text))
+
+    def chunk_text(self, text: str) -> List[str]:
+        """Chunks of a single normalized text"""
+        return list(self.iter_chunks([text]))
+
+    def iter_chunks(self, texts: Iterable[str]) -> Iterator[str]:
+        """
+        Split a stream of normalized texts into chunks
+
+        Only the tokens after the last full chunk are carried over to the next
+        text, so memory is bounded by a single text plus a chunk.
+
+        Args:
+            texts: Normalized texts, in document order
+
+        Yields:
+            Text chunks
+        """
+        pending = ""
+        covered = 0  # Leading tokens of pending already emitted (the overlap)
+        for text in texts:
+            if not text:
+                continue
+            pending = f"{pending} {text}" if pending else text
+            spans = self.token_spans(pending)
+            sentence_cuts = self._sentence_cuts(pending, spans)
+
+            start = 0
+            # Only cut full windows here; the rest may continue in the next text
+            while len(spans) - start > self.max_tokens:
+                cut = self._find_cut(start, sentence_cuts)
+                yield pending[spans[start][0]:spans[cut - 1][1]]
+                start = max(cut - self.overlap_tokens, start + 1)
+                covered = cut - start
+
+            pending = pending[spans[start][0]:] if start < len(spans) else ""
+
+        if pending:
+            spans = self.token_spans(pending)
+            if len(spans) > covered:
+                yield pending[spans[0][0]:spans[-1][1]]
+
+    def _find_cut(self, start: int, sentence_cuts: List[int]) -> int:
+        """End (exclusive token index) of the chunk starting at start"""
+        lowest, highest = start + self.min_tokens, start + self.max_tokens
+        position = bisect_right(sentence_cuts, highest)
+        if position and sentence_cuts[position - 1] >= max(lowest, start + 1):
+            return sentence_cuts[position - 1]
+        return highest
+
+    @staticmethod
+    def _sentence_cuts(text: str, spans: List[Span]) -> List[int]:
+        """Token indices right after the end of each sentence, ascending"""
+        token_ends = [end for _, end in spans]
+        cuts = []
+        for match in SENTENCE_END_PATTERN.finditer(text):
+            count = bisect_right(token_ends, match.end())
+            if count and (not cuts or cuts[-1] != count):
+                cuts.append(count)
+        return cuts
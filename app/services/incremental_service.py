@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Tuple
+
+from app.pydantics.models import PDFSuccessResponse
+from app.services.llm_service import LLMService
+from app.services.vector_service import VectorService
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalService:
+    """
+    Month-over-month processing of a report series
+
+    A manifest per series records the last document ingested for chat and the
+    part summaries of the last issue by part fingerprint, so a new issue only
+    embeds its changed pages and only summarizes its changed parts.
+    """
+
+    def __init__(self, vector_service: VectorService, llm_service: LLMService, series_dir: str = "app/utils/series"):
+        self.vector_service = vector_service
+        self.llm_service = llm_service
+        self.series_dir = series_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.series_dir, exist_ok=True)
+
+    @staticmethod
+    def series_name(pdf_name: str, series: str | None = None) -> str:
+        """The given series, or the PDF name without its digits ("wasde0625" -> "wasde")"""
+        name = series or re.sub(r"\d+", "", pdf_name).strip(" _-.") or pdf_name
+        return re.sub(r"[^A-Za-z0-9_-]+", "_", name)
+
+    def _manifest_path(self, series: str) -> str:
+        return os.path.join(self.series_dir, f"{series}.json")
+
+    def load(self, series: str) -> Dict[str, Any]:
+        """Manifest of a series; empty for a series without a previous issue"""
+        try:
+            with open(self._manifest_path(series), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"Error reading series manifest {series}: {str(e)}")
+            return {}
+
+    def _update(self, series: str, **fields: Any):
+        """Merge fields into the manifest of a series and write it atomically"""
+        with self._lock:
+            manifest = self.load(series)
+            manifest.update(fields, series=series, updated_at=time.time())
+            tmp_path = f"{self._manifest_path(series)}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self._manifest_path(series))
+
+    def vectorize_pages(self, pdf_data: PDFSuccessResponse, pages: Iterable[Tuple[int, str]],
+                        series: str | None = None) -> Dict[str, Any]:
+        """
+        Vectorize an issue, reusing the chunks of unchanged pages of the previous issue
+
+        Args:
+            pdf_data: Extracted PDF details
+            pages: (page_number, text) pairs, in page order
+            series: Report series; derived from the PDF name when omitted
+
+        Returns:
+            The vectorization result with pages_reused and pages_changed
+        """
+        series = self.series_name(pdf_data.pdf_filename, series)
+        previous = self.load(series).get("chat_pdf_name")
+        result = self.vector_service.vectorize_pages(pdf_data, pages, incremental=True, reuse_from=previous)
+        if result.get("status") == "success":
+            self._update(series, chat_pdf_name=pdf_data.pdf_filename)
+        result["series"] = series
+        return result
+
+    async def iter_summarize(self, pdf_name: str, total_pages: int | None = None,
+                             series: str | None = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Summarize an issue, reusing the part summaries of unchanged parts of the previous issue
+
+        Args:
+            pdf_name: Name of the PDF (directory name in utils)
+            total_pages: Page count of the PDF
+            series: Report series; derived from the PDF name when omitted
+
+        Yields:
+            The events of LLMService.iter_summarize; the final event also reports the parts
+            reused, summarized and failed
+        """
+        series = self.series_name(pdf_name, series)
+        previous_parts = self.load(series).get("parts", {})
+        parts, reused, failed = {}, 0, 0
+        async for event in self.llm_service.iter_summarize(pdf_name, total_pages, previous_parts):
+            if event["event"] == "part":
+                # A failed part carries the error text, which must never be reused as a summary
+                if event["failed"]:
+                    failed += 1
+                else:
+                    parts[event["fingerprint"]] = event["summary"]
+                    reused += event["reused"]
+            elif event["event"] == "final":
+                # Only this issue's parts are kept, so the manifest does not grow with the series;
+                # after a failure the previous issue's manifest stays, so the next run retries
+                if not failed:
+                    self._update(series, summary_pdf_name=pdf_name, parts=parts)
+                event.update(series=series, parts_reused=reused, parts_summarized=len(parts) - reused,
+                             parts_failed=failed)
+            yield event
+
+    async def summarize(self, pdf_name: str, total_pages: int | None = None, series: str | None = None) -> dict:
+        """Incremental counterpart of LLMService.summarize_nudge"""
+        try:
+            final_event = None
+            async for event in self.iter_summarize(pdf_name, total_pages, series):
+                if event["event"] == "final":
+                    final_event = event
+
+            return {
+                "success": True,
+                "pdf_name": pdf_name,
+                "series": final_event["series"],
+                "parts_reused": final_event["parts_reused"],
+                "parts_summarized": final_event["parts_summarized"],
+                "parts_failed": final_event["parts_failed"],
+                "summary": final_event["summary"]
+            }
+
+        except Exception as e:
+            logger.error(f"Error in incremental summarize: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
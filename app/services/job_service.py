@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import UploadFile
+
+from app.pydantics.models import JobResponse
+from app.services.llm_service import LLMService
+from app.services.pdf_service import PDFService, SPOOL_CHUNK_SIZE
+from app.services.vector_service import VectorService
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+
+class JobService:
+    """Background PDF jobs: persisted in SQLite and processed by a bounded pool of workers"""
+
+    def __init__(self, pdf_service: PDFService, vector_service: VectorService, llm_service: LLMService,
+                 workers: int = JOB_WORKERS):
+        self.pdf_service = pdf_service
+        self.vector_service = vector_service
+        self.llm_service = llm_service
+        self.workers = workers
+        self.jobs_dir = "app/utils/jobs"
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.jobs_dir, "jobs.db"), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db_lock = threading.Lock()
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._worker_tasks: List[asyncio.Task] = []
+        self._initialize_db()
+
+    def _initialize_db(self):
+        """Create the jobs table"""
+        with self._db_lock, self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    operation TEXT NOT NULL,
+                    pdf_name TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def start(self):
+        """Re-queue jobs left unfinished by a previous run and start the workers"""
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            self._update(row["id"], status="queued")
+            self._queue.put_nowait(row["id"])
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Cancel the workers; unfinished jobs are picked up again on the next start"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        with self._db_lock:
+            self._db.close()
+
+    def submit(self, file, operation: str) -> JobResponse:
+        """
+        Persist the upload and queue a job for it
+
+        Args:
+            file: FastAPI UploadFile object
+            operation: "summarize" or "chat"
+
+        Returns:
+            The queued job
+        """
+        job_id = uuid.uuid4().hex
+        pdf_name = os.path.splitext(file.filename)[0]
+        file_path = os.path.join(self.jobs_dir, f"{job_id}.pdf")
+        with open(file_path, 'wb') as f:
+            shutil.copyfileobj(file.file, f, SPOOL_CHUNK_SIZE)
+
+        now = time.time()
+        with self._db_lock, self._db:
+            self._db.execute(
+                "INSERT INTO jobs (id, operation, pdf_name, file_path, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                (job_id, operation, pdf_name, file_path, now, now)
+            )
+        self._queue.put_nowait(job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[JobResponse]:
+        """Current state of a job, or None if it does not exist"""
+        with self._db_lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_response(row) if row else None
+
+    def list_jobs(self, status: str | None = None, limit: int = 50) -> List[JobResponse]:
+        """Most recent jobs, optionally filtered by status"""
+        query, params = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._db_lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [self._to_response(row) for row in rows]
+
+    def queued_count(self) -> int:
+        return self._queue.qsize()
+
+    @staticmethod
+    def _to_response(row: sqlite3.Row) -> JobResponse:
+        return JobResponse(
+            job_id=row["id"],
+            operation=row["operation"],
+            pdf_name=row["pdf_name"],
+            status=row["status"],
+            progress=json.loads(row["progress"]),
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created_at=row["created_at"],
+            updated_at=row["updated_at"]
+        )
+
+    def _update(self, job_id: str, **fields: Any):
+        """Update columns of a job; progress and result are stored as JSON"""
+        for key in ("progress", "result"):
+            if key in fields and fields[key] is not None:
+                fields[key] = json.dumps(fields[key])
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{key} = ?" for key in fields)
+        with self._db_lock, self._db:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    async def _worker(self):
+        """Take job ids off the queue and run them one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in job {job_id}: {str(e)}")
+                self._update(job_id, status="failed", error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        """Process one job and record its result"""
+        with self._db_lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["status"] not in ("queued", "running"):
+            return
+
+        cancelled = False
+        try:
+            self._update(job_id, status="running", progress={"stage": "extracting"})
+            if row["operation"] == "summarize":
+                result = await self._summarize(job_id, row["file_path"], f"{row['pdf_name']}.pdf")
+            else:
+                result = await asyncio.to_thread(self._vectorize, job_id, row["file_path"], f"{row['pdf_name']}.pdf")
+
+            succeeded = result.get("success", result.get("status") == "success")
+            self._update(
+                job_id,
+                status="completed" if succeeded else "failed",
+                result=result,
+                error=None if succeeded else result.get("error")
+            )
+        except asyncio.CancelledError:
+            # Shutdown: the job is resumed from its upload at the next startup
+            cancelled = True
+            raise
+        finally:
+            if not cancelled and os.path.exists(row["file_path"]):
+                os.remove(row["file_path"])
+
+    def _vectorize(self, job_id: str, file_path: str, filename: str) -> Dict[str, Any]:
+        """Extract, chunk and embed the PDF (runs in a worker thread)"""
+        with open(file_path, 'rb') as f:
+            with self.pdf_service.extract_pages(UploadFile(f, filename=filename)) as (pdf_data, pages):
+                self._update(job_id, progress={"stage": "vectorizing", "total_pages": pdf_data.total_pages})
+                return self.vector_service.vectorize_pages(pdf_data, pages)
+
+    async def _summarize(self, job_id: str, file_path: str, filename: str) -> Dict[str, Any]:
+        """Extract the PDF into parts and summarize them, recording progress per part"""
+        with open(file_path, 'rb') as f:
+            extracted = await asyncio.to_thread(self.pdf_service.process_pdf, UploadFile(f, filename=filename))
+        if extracted.status != "success":
+            return {"success": False, "error": extracted.error}
+
+        progress = {"stage": "summarizing", "total_pages": extracted.total_pages, "parts_done": 0, "parts": {}}
+        self._update(job_id, progress=progress)
+        async for event in self.llm_service.iter_summarize(extracted.pdf_filename, extracted.total_pages):
+            if event["event"] == "part":
+                progress["total_parts"] = event["total_parts"]
+                progress["parts_done"] += 1
+                progress["parts"][str(event["part_index"])] = {
+                    "page_range": event["page_range"],
+                    "elapsed_seconds": event["elapsed_seconds"],
+                    "summary": event["summary"]
+                }
+                self._update(job_id, progress=progress)
+            elif event["event"] == "final":
+                progress["stage"] = "done"
+                self._update(job_id, progress=progress)
+                return {"success": True, "pdf_name": extracted.pdf_filename, "summary": event["summary"]}
+        return {"success": False, "error": "Summarization produced no final summary"}
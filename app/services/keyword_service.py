@@ -0,0 +1,122 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+# Keeps marketing years ("2024/25"), decimals ("1.5") and abbreviations ("u.s") as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[./][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was were "
+    "what when where which who why will with about does do did can could would should me tell show "
+    "give please".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms of the text, without stopwords"""
+    return [term for term in TOKEN_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class _DocumentIndex:
+    """Postings and chunk lengths of one document"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.chunk_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+
+    def add(self, chunk_id: str, text: str):
+        terms = tokenize(text)
+        self.remove(chunk_id)
+        frequencies = Counter(terms)
+        for term, frequency in frequencies.items():
+            self.postings[term][chunk_id] = frequency
+        self.chunk_terms[chunk_id] = list(frequencies)
+        self.lengths[chunk_id] = len(terms)
+        self.total_length += len(terms)
+
+    def remove(self, chunk_id: str):
+        if chunk_id not in self.lengths:
+            return
+        self.total_length -= self.lengths.pop(chunk_id)
+        for term in self.chunk_terms.pop(chunk_id):
+            del self.postings[term][chunk_id]
+            if not self.postings[term]:
+                del self.postings[term]
+
+
+class KeywordIndex:
+    """In-process inverted index over chunks, one per document, scored with BM25"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._documents: Dict[str, _DocumentIndex] = {}
+        self._lock = threading.Lock()
+
+    def has_document(self, pdf_name: str) -> bool:
+        return pdf_name in self._documents
+
+    def add_chunks(self, pdf_name: str, chunk_ids: List[str], texts: List[str]):
+        """Index chunks of a document"""
+        with self._lock:
+            index = self._documents.setdefault(pdf_name, _DocumentIndex())
+            for chunk_id, text in zip(chunk_ids, texts):
+                index.add(chunk_id, text)
+
+    def remove_chunks(self, pdf_name: str, chunk_ids: List[str]):
+        """Drop chunks of a document from the index"""
+        with self._lock:
+            index = self._documents.get(pdf_name)
+            if index is None:
+                return
+            for chunk_id in chunk_ids:
+                index.remove(chunk_id)
+
+    def remove_document(self, pdf_name: str):
+        with self._lock:
+            self._documents.pop(pdf_name, None)
+
+    def is_keyword_lookup(self, pdf_name: str, query: str, max_terms: int) -> bool:
+        """
+        Whether the query is a short list of terms that all occur in the document
+
+        Such queries are answered by the lexical index alone.
+        """
+        terms = tokenize(query)
+        index = self._documents.get(pdf_name)
+        if index is None or not terms or len(terms) > max_terms:
+            return False
+        return all(term in index.postings for term in terms)
+
+    def search(self, pdf_name: str, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Rank the chunks of a document against the query with BM25
+
+        Args:
+            pdf_name: Document to search
+            query: Query text
+            top_k: Number of results to return
+
+        Returns:
+            (chunk_id, score) pairs, best first
+        """
+        with self._lock:
+            index = self._documents.get(pdf_name)
+            if index is None or not index.lengths:
+                return []
+            chunk_count = len(index.lengths)
+            average_length = index.total_length / chunk_count or 1.0
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                chunks = index.postings.get(term)
+                if not chunks:
+                    continue
+                idf = math.log(1 + (chunk_count - len(chunks) + 0.5) / (len(chunks) + 0.5))
+                for chunk_id, frequency in chunks.items():
+                    length_norm = 1 - self.b + self.b * index.lengths[chunk_id] / average_length
+                    scores[chunk_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Dict, List
+
+from openai import AsyncOpenAI
+
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # openai, openai_compatible or local
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+# Local backend: time to the first token, then output tokens per second (0: no delay)
+LOCAL_LLM_LATENCY_MS = float(os.getenv("LOCAL_LLM_LATENCY_MS", "0"))
+LOCAL_LLM_TOKENS_PER_SECOND = float(os.getenv("LOCAL_LLM_TOKENS_PER_SECOND", "0"))
+LOCAL_LLM_OUTPUT_TOKENS = int(os.getenv("LOCAL_LLM_OUTPUT_TOKENS", "200"))
+
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z'-]+")
+
+Messages = List[Dict[str, str]]
+
+
+class LLMBackend(ABC):
+    """Chat completions for LLMService: a whole reply, or its text deltas as they are generated"""
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def cache_model(self) -> str:
+        """Model name cached summaries are keyed on"""
+        return self.model
+
+    @abstractmethod
+    async def complete(self, messages: Messages, max_tokens: int, temperature: float = 0.2) -> str:
+        """The whole reply"""
+
+    @abstractmethod
+    def stream(self, messages: Messages, max_tokens: int, temperature: float = 0.2) -> AsyncIterator[str]:
+        """Text deltas of the reply, as they are generated"""
+
+    async def close(self):
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI, or any server implementing its chat completions API at base_url"""
+
+    def __init__(self, model: str, api_key: str, base_url: str = OPENAI_BASE_URL, name: str = "openai"):
+        super().__init__(model)
+        self.name = name
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+    async def complete(self, messages: Messages, max_tokens: int, temperature: float = 0.2) -> str:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format={"type": "text"},
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return response.choices[0].message.content
+
+    async def stream(self, messages: Messages, max_tokens: int, temperature: float = 0.2) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format={"type": "text"},
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        async for event in stream:
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                yield delta
+
+    async def close(self):
+        await self.client.close()
+
+
+class LocalBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for load tests and benchmarks
+
+    The reply is built from the words of the last message, so the same input
+    always gives the same output. After latency_ms, tokens (words) arrive at
+    tokens_per_second, which lets a run separate the pipeline's own overhead
+    from provider latency.
+    """
+
+    name = "local"
+
+    def __init__(self, model: str = "local", latency_ms: float = LOCAL_LLM_LATENCY_MS,
+                 tokens_per_second: float = LOCAL_LLM_TOKENS_PER_SECOND,
+                 output_tokens: int = LOCAL_LLM_OUTPUT_TOKENS):
+        super().__init__(model)
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+
+    @property
+    def cache_model(self) -> str:
+        # Never serve fake summaries to a real backend of the same model name
+        return f"local:{self.model}"
+
+    def reply_tokens(self, messages: Messages, max_tokens: int) -> List[str]:
+        """Words of the reply: a digest of the conversation, then words of the last message in order"""
+        content = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256("\n".join(message["content"] for message in messages).encode("utf-8")).hexdigest()
+        words = WORD_PATTERN.findall(content) or ["empty"]
+        count = max(1, min(max_tokens, self.output_tokens))
+        tokens = [f"[{digest[:8]}]"] + [words[index % len(words)] for index in range(count - 1)]
+        return [f"{token} " if index < count - 1 else f"{token}." for index, token in enumerate(tokens)]
+
+    async def complete(self, messages: Messages, max_tokens: int, temperature: float = 0.2) -> str:
+        tokens = self.reply_tokens(messages, max_tokens)
+        delay = self.latency_ms / 1000
+        if self.tokens_per_second > 0:
+            delay += len(tokens) / self.tokens_per_second
+        if delay:
+            await asyncio.sleep(delay)
+        return "".join(tokens)
+
+    async def stream(self, messages: Messages, max_tokens: int, temperature: float = 0.2) -> AsyncIterator[str]:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        for token in self.reply_tokens(messages, max_tokens):
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield token
+
+
+def build_backend(backend: str = LLM_BACKEND, model: str = LLM_MODEL, base_url: str = LLM_BASE_URL,
+                  api_key: str | None = None) -> LLMBackend:
+    """
+    The LLM backend selected by LLM_BACKEND
+
+    Args:
+        backend: "openai", "openai_compatible" (a self-hosted server at base_url) or "local"
+        model: Model name sent to the server
+        base_url: Base URL of the OpenAI-compatible server; overrides the OpenAI URL for "openai" too
+        api_key: API key; OPENAI_API_KEY when omitted
+
+    Returns:
+        The backend
+
+    Raises:
+        ValueError: Unknown backend, or "openai_compatible" without a base URL
+    """
+    api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+    if backend == "openai":
+        return OpenAIBackend(model, api_key, base_url or OPENAI_BASE_URL)
+    if backend == "openai_compatible":
+        if not base_url:
+            raise ValueError("LLM_BASE_URL is required for the openai_compatible backend")
+        # Self-hosted servers often need no key, but the client requires one
+        return OpenAIBackend(model, api_key or "not-needed", base_url, name="openai_compatible")
+    if backend == "local":
+        return LocalBackend(model)
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
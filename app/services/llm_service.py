@@ -1,29 +1,52 @@
+import asyncio
+import hashlib
 import logging
 import os
-
-from openai import AsyncOpenAI
+import re
+import time
+from typing import Any, AsyncIterator, Dict
 
 from app.pydantics.models import ChatResponse
+from app.services.cache_service import SummaryCache
 from app.services.chat_service import ChatService
+from app.services.chunking_service import page_fingerprint
+from app.services.llm_backends import LLMBackend, Messages
+from app.services.metrics_service import metrics
+from app.services.pdf_service import PAGES_PER_PART
+from app.services.prompt_service import PromptPacker
+from app.services.vector_service import VectorService
 from app.templates.prompt_template import OperationType
 
 logger = logging.getLogger(__name__)
 
-CLIENT = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY", ""), base_url="https://api.openai.com/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+# Output limits per operation, sized to the lengths the prompts ask for
+MAX_OUTPUT_TOKENS = {
+    "part": int(os.getenv("LLM_MAX_TOKENS_PART", "2500")),
+    "final": int(os.getenv("LLM_MAX_TOKENS_FINAL", "6000")),
+    "chat": int(os.getenv("LLM_MAX_TOKENS_CHAT", "1200"))
+}
 
 global_memory = {} # To store non-persisted chat
 
 class LLMService:
     """LLM Service for summarizing PDF content"""
 
-    def __init__(self):
-        self.active_model = "gpt-4o-mini"
+    def __init__(self, backend: LLMBackend, vector_service: VectorService):
+        self.backend = backend
+        self.vector_service = vector_service
+        self.active_model = backend.model
         self.utils_dir = "app/utils"
+        self.summary_cache = SummaryCache()
+        self.prompt_packer = PromptPacker(self.active_model)
 
     async def summarize_nudge(self, pdf_name: str) -> dict:
         """
         Process all parts of a PDF and summarize each part
 
+        Part summaries are requested concurrently (bounded by LLM_MAX_CONCURRENCY)
+        and saved as soon as each one arrives; the grouped summary keeps part order.
+
         Args:
             pdf_name: Name of the PDF (directory name in utils)
 
@@ -31,31 +54,10 @@ class LLMService:
             dict: Processing result
         """
         try:
-            # Find PDF directory
-            pdf_dir = os.path.join(self.utils_dir, pdf_name)
-
-            # Get all part files
-            part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
-            part_files.sort()
-
-            grouped_summary = ""
-            # Process each part
-            for part_file in part_files:
-                part_path = os.path.join(pdf_dir, part_file)
-
-                # Read the part content
-                with open(part_path, 'r', encoding='utf-8') as f:
-                    extracted_data = f.read()
-
-                # Getting part name (e.g., "part_1" from "part_1.txt")
-                part_name = os.path.splitext(part_file)[0]
-
-                # Summarize the data
-                summarized_data = await self.invoke_llm(extracted_data, OperationType(type="part"))
-                grouped_summary += f"{part_file}\n\n {summarized_data}\n\n"
-                await self._save_summary(pdf_name, part_name, summarized_data)
-
-            final_summary = await self.invoke_llm(grouped_summary, OperationType(type="final"))
+            final_summary = None
+            async for event in self.iter_summarize(pdf_name):
+                if event["event"] == "final":
+                    final_summary = event["summary"]
 
             return {
                 "success": True,
@@ -70,6 +72,128 @@ class LLMService:
                 "error": str(e)
             }
 
+    async def iter_summarize(self, pdf_name: str, total_pages: int | None = None,
+                             previous_parts: Dict[str, str] | None = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Summarize all parts of a PDF, yielding each result as soon as it is ready
+
+        Args:
+            pdf_name: Name of the PDF (directory name in utils)
+            total_pages: Page count of the PDF, used for the page range of the last part
+            previous_parts: Part summaries of an earlier issue by part fingerprint; parts
+                            with a matching fingerprint reuse the summary instead of calling the LLM
+
+        Yields:
+            One "part" event per part summary, in completion order, then a "final" event
+        """
+        started = time.perf_counter()
+
+        # Find PDF directory
+        pdf_dir = os.path.join(self.utils_dir, pdf_name)
+
+        # Get all part files, ordered by part number (part_2 before part_10)
+        part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
+        part_files.sort(key=self._part_number)
+
+        semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        tasks = [
+            asyncio.ensure_future(self._summarize_part(pdf_name, pdf_dir, part_file, semaphore, previous_parts))
+            for part_file in part_files
+        ]
+        part_summaries = {}
+        try:
+            for next_part in asyncio.as_completed(tasks):
+                part_file, summarized_data, fingerprint, reused, failed = await next_part
+                part_summaries[part_file] = summarized_data
+                part_index = self._part_number(part_file)
+                first_page = (part_index - 1) * PAGES_PER_PART + 1
+                last_page = part_index * PAGES_PER_PART
+                if total_pages:
+                    last_page = min(last_page, total_pages)
+                yield {
+                    "event": "part",
+                    "part_index": part_index,
+                    "total_parts": len(part_files),
+                    "page_range": [first_page, last_page],
+                    "elapsed_seconds": round(time.perf_counter() - started, 3),
+                    "fingerprint": fingerprint,
+                    "reused": reused,
+                    "failed": failed,
+                    "summary": summarized_data
+                }
+        finally:
+            # Stop the remaining calls if the consumer goes away
+            for task in tasks:
+                task.cancel()
+
+        grouped_summary = ""
+        for part_file in part_files:
+            grouped_summary += f"{part_file}\n\n {part_summaries[part_file]}\n\n"
+
+        final_summary = await self.invoke_llm(grouped_summary, OperationType(type="final"))
+        yield {
+            "event": "final",
+            "pdf_name": pdf_name,
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "summary": final_summary
+        }
+
+    async def _summarize_part(self, pdf_name: str, pdf_dir: str, part_file: str, semaphore: asyncio.Semaphore,
+                              previous_parts: Dict[str, str] | None = None) -> tuple[str, str, str, bool, bool]:
+        """
+        Summarize a single part file and save its summary
+
+        Args:
+            pdf_name: Name of the PDF
+            pdf_dir: Directory holding the part files
+            part_file: Part file name (e.g., "part_1.txt")
+            semaphore: Limits the number of in-flight LLM calls
+            previous_parts: Earlier part summaries by part fingerprint
+
+        Returns:
+            Part file name, summarized text of the part (the error message if the LLM call failed),
+            part fingerprint, whether the summary was reused and whether the LLM call failed
+        """
+        part_path = os.path.join(pdf_dir, part_file)
+
+        # Read the part content
+        with open(part_path, 'r', encoding='utf-8') as f:
+            extracted_data = f.read()
+
+        # Getting part name (e.g., "part_1" from "part_1.txt")
+        part_name = os.path.splitext(part_file)[0]
+
+        fingerprint = self.part_fingerprint(extracted_data)
+        summarized_data = (previous_parts or {}).get(fingerprint)
+        reused = summarized_data is not None
+        failed = False
+        if not reused:
+            # Summarize the data
+            async with semaphore:
+                try:
+                    summarized_data = await self._invoke_llm(extracted_data, OperationType(type="part"))
+                    failed = not summarized_data
+                except Exception as e:
+                    logger.error(f"Error summarizing {part_file}: {str(e)}")
+                    summarized_data, failed = f"Error summarizing data: {str(e)}", True
+        await self._save_summary(pdf_name, part_name, summarized_data)
+        return part_file, summarized_data, fingerprint, reused, failed
+
+    @staticmethod
+    def part_fingerprint(part_content: str) -> str:
+        """Hash of the page numbers and page fingerprints of a part file"""
+        pages = re.split(r"--- PAGE (\d+) ---\n", part_content)[1:]
+        digest = hashlib.sha256()
+        for page_number, page_text in zip(pages[::2], pages[1::2]):
+            digest.update(f"{page_number}:{page_fingerprint(page_text)}\n".encode("utf-8"))
+        return digest.hexdigest()[:24]
+
+    @staticmethod
+    def _part_number(part_file: str) -> int:
+        """Numeric part index of a part file name (e.g., 10 for "part_10.txt")"""
+        match = re.search(r"\d+", part_file)
+        return int(match.group()) if match else 0
+
     async def invoke_llm(self,
               input_content: str,
               current_operation: OperationType,
@@ -87,36 +211,110 @@ class LLMService:
             Summarized text or llm_reply in a pydantic way
         """
         try:
-            if current_operation.in_chat_mode():
-                prompt = self._build_chat_prompt(input_content, pdf_name)
-            else:
-                prompt = current_operation.dynamic_prompt()
-            response = await CLIENT.chat.completions.create(
-                model=self.active_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": input_content
-                    }
-                ],
-                response_format={"type": "text"},
-                max_tokens=16000,
-                temperature=0.2
-            )
-
-            llm_response =  response.choices[0].message.content
-            if current_operation.in_chat_mode():
-                return self.chat_response(llm_response, pdf_name)
-            return response.choices[0].message.content
-
+            return await self._invoke_llm(input_content, current_operation, pdf_name)
         except Exception as e:
             logger.error(f"Error in _summarize_data: {str(e)}")
             return f"Error summarizing data: {str(e)}"
 
+    async def _invoke_llm(self, input_content: str, current_operation: OperationType, pdf_name: str | None = None):
+        """invoke_llm, raising the errors of the LLM call instead of returning them as text"""
+        cache_key = None
+        if current_operation.in_chat_mode():
+            # Retrieval (query embedding and vector search) blocks, so it runs off the event loop
+            prompt = await asyncio.to_thread(self._build_chat_prompt, input_content, pdf_name)
+        else:
+            prompt = current_operation.dynamic_prompt()
+            cache_key = self.summary_cache.make_key(input_content, prompt, self.backend.cache_model)
+            cached_summary = self.summary_cache.get(cache_key)
+            metrics.cache_lookup("summary", cached_summary is not None, cached_summary is None)
+            if cached_summary is not None:
+                return cached_summary
+        llm_response = await self._complete(
+            current_operation.type,
+            messages=[
+                {
+                    "role": "system",
+                    "content": prompt
+                },
+                {
+                    "role": "user",
+                    "content": input_content
+                }
+            ],
+            max_tokens=MAX_OUTPUT_TOKENS[current_operation.type]
+        )
+
+        if current_operation.in_chat_mode():
+            return self.chat_response(llm_response, pdf_name)
+        if llm_response:
+            self.summary_cache.set(cache_key, llm_response)
+        return llm_response
+
+    async def stream_chat(self, user_query: str, pdf_name: str) -> AsyncIterator[str]:
+        """
+        Generate a chat response and yield the token deltas as they arrive
+
+        The full reply is recorded in the chat memory once the stream completes.
+
+        Args:
+            user_query: Question of the user
+            pdf_name: name of the pdf file
+
+        Yields:
+            Text deltas of the reply
+        """
+        # Retrieval blocks; on the event loop it would stall every other open stream
+        prompt = await asyncio.to_thread(self._build_chat_prompt, user_query, pdf_name)
+        messages = [
+            {
+                "role": "system",
+                "content": prompt
+            },
+            {
+                "role": "user",
+                "content": user_query
+            }
+        ]
+
+        reply = []
+        started = time.perf_counter()
+        in_flight = metrics.llm_in_flight.labels("chat")
+        in_flight.inc()
+        try:
+            async for delta in self.backend.stream(messages=messages, max_tokens=MAX_OUTPUT_TOKENS["chat"],
+                                                   temperature=0.2):
+                if not reply:
+                    metrics.llm_first_token_seconds.labels(self.backend.name).observe(time.perf_counter() - started)
+                reply.append(delta)
+                yield delta
+        except Exception:
+            metrics.llm_errors.labels("chat").inc()
+            raise
+        finally:
+            in_flight.dec()
+        metrics.llm_seconds.labels("chat", self.backend.name).observe(time.perf_counter() - started)
+        self._count_tokens("chat", messages, "".join(reply))
+        self._get_chat_service(pdf_name).add_bot_message("".join(reply))
+
+    async def _complete(self, operation: str, messages: Messages, max_tokens: int) -> str:
+        """Call the backend, recording the latency, tokens and failures of the operation"""
+        started = time.perf_counter()
+        try:
+            with metrics.llm_in_flight.labels(operation).track_inprogress():
+                reply = await self.backend.complete(messages=messages, max_tokens=max_tokens, temperature=0.2)
+        except Exception:
+            metrics.llm_errors.labels(operation).inc()
+            raise
+        metrics.llm_seconds.labels(operation, self.backend.name).observe(time.perf_counter() - started)
+        self._count_tokens(operation, messages, reply)
+        return reply
+
+    def _count_tokens(self, operation: str, messages: Messages, reply: str | None):
+        """Prompt and completion tokens, counted with the model's tokenizer for every backend"""
+        counter = self.prompt_packer.counter
+        metrics.llm_tokens.labels(operation, "prompt").inc(sum(counter.count(message["content"]) for message in messages))
+        metrics.llm_tokens.labels(operation, "completion").inc(counter.count(reply or ""))
+
     async def _save_summary(self, pdf_name: str, part: str, summarized_data: str):
         """
         Save summarized data to file
@@ -144,22 +342,20 @@ class LLMService:
             logger.error(f"Error in _save_summary: {str(e)}")
             raise e
 
-    @staticmethod
-    def _build_chat_prompt(user_query, pdf_name):
-        chat_service = global_memory.get(pdf_name, None)
-        if not chat_service:
-            chat_service = ChatService()
-            global_memory[pdf_name] = chat_service
+    def _build_chat_prompt(self, user_query, pdf_name):
+        chat_service = self._get_chat_service(pdf_name)
         chat_service.add_user_message(user_query)
         dynamic_prompt = chat_service.get_dynamic_prompt(user_query)
         return dynamic_prompt
 
     def chat_response(self, llm_response: str, pdf_name: str):
-        chat_service = global_memory.get(pdf_name, None)
-        if not chat_service:
-            chat_service = ChatService()
-            global_memory[pdf_name] = chat_service
+        chat_service = self._get_chat_service(pdf_name)
         chat_service.add_bot_message(llm_response)
         return ChatResponse(llm_reply=llm_response)
 
-
+    def _get_chat_service(self, pdf_name: str) -> ChatService:
+        chat_service = global_memory.get(pdf_name, None)
+        if not chat_service:
+            chat_service = ChatService(self.vector_service, pdf_name, self.prompt_packer)
+            global_memory[pdf_name] = chat_service
+        return chat_service
@@ -0,0 +1,110 @@
+import time
+from typing import Iterable, Iterator, Tuple, TypeVar
+
+from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.routing import Match
+
+T = TypeVar("T")
+
+# Stage buckets from a millisecond to a few minutes; LLM calls take seconds to minutes
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 180.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+PAGE_BUCKETS = (1, 5, 10, 20, 40, 80, 160, 320, 640)
+
+
+class MetricsService:
+    """Prometheus metrics of the pipeline stages, LLM calls, caches and HTTP requests"""
+
+    def __init__(self, registry: CollectorRegistry | None = None):
+        self.registry = registry or CollectorRegistry()
+        self.pdf_extraction_seconds = Histogram(
+            "summarizer_pdf_extraction_seconds", "Time spent extracting the text of a PDF",
+            buckets=STAGE_BUCKETS, registry=self.registry)
+        self.pdf_pages = Histogram(
+            "summarizer_pdf_pages", "Pages per extracted PDF", buckets=PAGE_BUCKETS, registry=self.registry)
+        self.chunking_seconds = Histogram(
+            "summarizer_chunking_seconds", "Time spent chunking a document during vectorization",
+            buckets=STAGE_BUCKETS, registry=self.registry)
+        self.embedding_batch_seconds = Histogram(
+            "summarizer_embedding_batch_seconds", "Duration of an embedding model encode call",
+            buckets=STAGE_BUCKETS, registry=self.registry)
+        self.embedding_texts = Counter(
+            "summarizer_embedding_texts", "Texts encoded by the embedding model", registry=self.registry)
+        self.vector_write_seconds = Histogram(
+            "summarizer_vector_write_seconds", "Time spent writing a document's chunks to ChromaDB",
+            buckets=STAGE_BUCKETS, registry=self.registry)
+        self.vector_query_seconds = Histogram(
+            "summarizer_vector_query_seconds", "ChromaDB query latency", ["scope"],
+            buckets=STAGE_BUCKETS, registry=self.registry)
+        self.search_seconds = Histogram(
+            "summarizer_search_seconds", "Retrieval latency by search mode (vector, lexical or hybrid)", ["mode"],
+            buckets=STAGE_BUCKETS, registry=self.registry)
+        self.llm_seconds = Histogram(
+            "summarizer_llm_request_seconds", "LLM call latency by operation", ["operation", "backend"],
+            buckets=LLM_BUCKETS, registry=self.registry)
+        self.llm_first_token_seconds = Histogram(
+            "summarizer_llm_first_token_seconds", "Time to the first token of a streamed LLM reply", ["backend"],
+            buckets=LLM_BUCKETS, registry=self.registry)
+        self.llm_tokens = Counter(
+            "summarizer_llm_tokens", "LLM tokens by operation and kind (prompt or completion)",
+            ["operation", "kind"], registry=self.registry)
+        self.llm_errors = Counter(
+            "summarizer_llm_errors", "Failed LLM calls by operation", ["operation"], registry=self.registry)
+        self.llm_in_flight = Gauge(
+            "summarizer_llm_requests_in_flight", "LLM calls in progress by operation", ["operation"],
+            registry=self.registry)
+        self.cache_requests = Counter(
+            "summarizer_cache_requests", "Cache lookups by cache and result (hit or miss)", ["cache", "result"],
+            registry=self.registry)
+        self.http_in_flight = Gauge(
+            "summarizer_http_requests_in_flight", "HTTP requests in progress by route", ["method", "route"],
+            registry=self.registry)
+        self.http_seconds = Histogram(
+            "summarizer_http_request_seconds", "HTTP request latency by route and status",
+            ["method", "route", "status"], buckets=STAGE_BUCKETS, registry=self.registry)
+
+    def cache_lookup(self, cache: str, hits: int, misses: int = 0):
+        """Record cache hits and misses; the hit rate is hits / (hits + misses)"""
+        if hits:
+            self.cache_requests.labels(cache, "hit").inc(hits)
+        if misses:
+            self.cache_requests.labels(cache, "miss").inc(misses)
+
+    def observe_iteration(self, items: Iterable[T], seconds: Histogram, count: Histogram | None = None) -> Iterator[T]:
+        """
+        Pass items through, timing only the work of producing them
+
+        Once the items are exhausted, the time spent inside the producer (not in
+        the consumer between items) is observed in seconds and the item count in count.
+        """
+        elapsed, produced = 0.0, 0
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - started
+                break
+            elapsed += time.perf_counter() - started
+            produced += 1
+            yield item
+        seconds.observe(elapsed)
+        if count is not None:
+            count.observe(produced)
+
+    @staticmethod
+    def route_of(app, scope) -> str:
+        """Route template of a request ("/jobs/{job_id}"), so labels do not grow with ids"""
+        for route in app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    def render(self) -> Tuple[bytes, str]:
+        """Current metrics in the Prometheus text format, and its content type"""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+
+metrics = MetricsService()
@@ -1,69 +1,238 @@
+import math
+import multiprocessing
 import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Tuple
 
 import fitz  # PyMuPDF
 
 from app.pydantics.models import PDFSuccessResponse, PDFErrorResponse
+from app.services.metrics_service import metrics
+from app.services.table_service import TableService
+
+PAGES_PER_PART = 10
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0"))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_WRITE_PARTS = os.getenv("PDF_WRITE_PARTS", "False").lower() == "true"
+
+_EXTRACT_POOL: ProcessPoolExecutor | None = None
+_EXTRACT_POOL_LOCK = threading.Lock()
+
+
+def _extract_page_range(pdf_path: str, start_page: int, end_page: int) -> List[str]:
+    """Extract the text of pages [start_page, end_page) in a worker process with its own fitz handle"""
+    with fitz.open(pdf_path) as doc:
+        return [doc[page_num].get_text() for page_num in range(start_page, end_page)]
+
+
+def get_extract_pool(workers: int) -> ProcessPoolExecutor:
+    """Create the shared extraction process pool on first use"""
+    global _EXTRACT_POOL
+    with _EXTRACT_POOL_LOCK:
+        if _EXTRACT_POOL is None:
+            # spawn, not fork: the API process runs threads (event loop, torch) that fork would copy mid-state
+            _EXTRACT_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _EXTRACT_POOL
+
+
+def shutdown_extract_pool():
+    """Stop the shared extraction process pool, if it was started"""
+    global _EXTRACT_POOL
+    with _EXTRACT_POOL_LOCK:
+        if _EXTRACT_POOL is not None:
+            _EXTRACT_POOL.shutdown(cancel_futures=True)
+            _EXTRACT_POOL = None
 
 
 class PDFService:
     """PDF Service to extract and store text in parts"""
 
-    def __init__(self):
+    def __init__(self, extract_workers: int = PDF_EXTRACT_WORKERS, table_service: TableService | None = None):
         self.utils_dir = "app/utils"
+        self.extract_workers = extract_workers
+        self.table_service = table_service
         self.ensure_utils_directory()
 
     def ensure_utils_directory(self):
         """Ensure the utils directory exists"""
         os.makedirs(self.utils_dir, exist_ok=True)
 
-    def process_pdf(self, file) -> PDFSuccessResponse | PDFErrorResponse:
+    def spool_upload(self, file) -> str:
         """
-        Process uploaded PDF file and save text in 10-page per part
+        Copy the uploaded file to a temporary file on disk in fixed-size chunks
 
         Args:
             file: FastAPI UploadFile object
 
         Returns:
-            dict: Processing result with details
+            Path of the temporary PDF file (the caller removes it)
         """
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            shutil.copyfileobj(file.file, tmp, SPOOL_CHUNK_SIZE)
+            return tmp.name
+
+    @staticmethod
+    def count_pages(pdf_path: str) -> int:
+        """Number of pages of the PDF on disk"""
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+
+    def iter_pages(self, pdf_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield the text of each page, in page order
+
+        Long documents are extracted in parallel page ranges by a process pool
+        when extract_workers > 1; otherwise pages are read one at a time.
+
+        Args:
+            pdf_path: Path of the PDF on disk
+
+        Yields:
+            (page_number, text) with 1-based page numbers
+        """
+        total_pages = self.count_pages(pdf_path)
+        if self.extract_workers > 1 and total_pages >= PDF_PARALLEL_MIN_PAGES:
+            yield from self._iter_pages_parallel(pdf_path, total_pages)
+            return
+
+        with fitz.open(pdf_path) as doc:
+            for page_num in range(len(doc)):
+                yield page_num + 1, doc[page_num].get_text()
+
+    def _iter_pages_parallel(self, pdf_path: str, total_pages: int) -> Iterator[Tuple[int, str]]:
+        """Split the pages into ranges across the process pool and reassemble them in order"""
+        # A few ranges per worker keeps the workers evenly loaded
+        range_size = max(1, math.ceil(total_pages / (self.extract_workers * 4)))
+        starts = list(range(0, total_pages, range_size))
+        ends = [min(start + range_size, total_pages) for start in starts]
+
+        pool = get_extract_pool(self.extract_workers)
+        page_ranges = pool.map(_extract_page_range, [pdf_path] * len(starts), starts, ends)
+        for start, texts in zip(starts, page_ranges):
+            for offset, text in enumerate(texts):
+                yield start + offset + 1, text
+
+    @staticmethod
+    def format_page(page_number: int, text: str) -> str:
+        """Page text as it appears in the part files"""
+        return f"--- PAGE {page_number} ---\n{text}\n\n"
+
+    @contextmanager
+    def extract_pages(self, file, write_parts: bool = PDF_WRITE_PARTS) -> Iterator[Tuple[PDFSuccessResponse, Iterator[Tuple[int, str]]]]:
+        """
+        Spool the upload to disk and expose its pages as a stream
+
+        Args:
+            file: FastAPI UploadFile object
+            write_parts: Also write the 10-page part files while the pages are consumed
+
+        Yields:
+            (PDFSuccessResponse, iterator of (page_number, text)); the spooled file
+            is removed when the context exits. With a table service, the supply and
+            use tables are parsed into its columnar store as the pages are consumed.
+        """
+        pdf_path = self.spool_upload(file)
         try:
             # Get PDF filename without extension
             pdf_filename = os.path.splitext(file.filename)[0]
+            yield self.open_pages(pdf_path, pdf_filename, write_parts)
+        finally:
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
 
-            # Create directory for this PDF
-            pdf_dir = os.path.join(self.utils_dir, pdf_filename)
-            os.makedirs(pdf_dir, exist_ok=True)
+    def open_pages(self, pdf_path: str, pdf_filename: str, write_parts: bool = PDF_WRITE_PARTS,
+                   pages: Iterable[Tuple[int, str]] | None = None) -> Tuple[PDFSuccessResponse, Iterator[Tuple[int, str]]]:
+        """
+        Expose the pages of a PDF on disk as a stream
 
-            # Read file content and open PDF
-            file_content = file.file.read()
-            doc = fitz.open(stream=file_content, filetype="pdf")
-            total_pages = len(doc)
+        Args:
+            pdf_path: Path of the PDF on disk
+            pdf_filename: PDF filename without extension
+            write_parts: Also write the 10-page part files while the pages are consumed
+            pages: Pages already extracted elsewhere; read from pdf_path when omitted
 
-            # Process in chunks of 10 pages
-            pages_per_chunk = 10
-            part_number = 1
+        Returns:
+            PDFSuccessResponse and an iterator of (page_number, text), with the
+            tables parsed as the pages are consumed when there is a table service
+        """
+        total_pages = self.count_pages(pdf_path)
+        if pages is not None:
+            pages = iter(pages)
+        else:
+            pages = metrics.observe_iteration(self.iter_pages(pdf_path), metrics.pdf_extraction_seconds,
+                                              metrics.pdf_pages)
+        if self.table_service is not None:
+            pages = self.table_service.extract(pdf_filename, pages)
+        if write_parts:
+            pages = self._write_parts(pdf_filename, pages)
+        return PDFSuccessResponse(pdf_filename=pdf_filename, total_pages=total_pages), pages
+
+    def read_pages_in_process(self, pdf_path: str, workers: int) -> List[Tuple[int, str]]:
+        """
+        Extract every page of a PDF in one process of the shared extraction pool
 
-            for start_page in range(0, total_pages, pages_per_chunk):
-                end_page = min(start_page + pages_per_chunk, total_pages)
+        Used to extract several documents at once: each document takes a
+        worker process, which scales past the GIL the way page ranges do.
 
-                # Extract text from this chunk
-                chunk_text = ""
-                for page_num in range(start_page, end_page):
-                    page = doc[page_num]
-                    text = page.get_text()
-                    chunk_text += f"--- PAGE {page_num + 1} ---\n{text}\n\n"
+        Args:
+            pdf_path: Path of the PDF on disk
+            workers: Size of the extraction pool, if it is not running yet
+
+        Returns:
+            (page_number, text) pairs, in page order
+        """
+        started = time.perf_counter()
+        texts = get_extract_pool(workers).submit(_extract_page_range, pdf_path, 0, self.count_pages(pdf_path)).result()
+        metrics.pdf_extraction_seconds.observe(time.perf_counter() - started)
+        metrics.pdf_pages.observe(len(texts))
+        return list(enumerate(texts, start=1))
+
+    def _write_parts(self, pdf_filename: str, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """Write pages into part files of 10 pages each while passing them through"""
+        # Create directory for this PDF
+        pdf_dir = os.path.join(self.utils_dir, pdf_filename)
+        os.makedirs(pdf_dir, exist_ok=True)
+
+        part_file = None
+        try:
+            for page_number, text in pages:
+                if (page_number - 1) % PAGES_PER_PART == 0:
+                    if part_file:
+                        part_file.close()
+                    part_number = (page_number - 1) // PAGES_PER_PART + 1
+                    part_path = os.path.join(pdf_dir, f"part_{part_number}.txt")
+                    part_file = open(part_path, 'w', encoding='utf-8')
+                part_file.write(self.format_page(page_number, text))
+                yield page_number, text
+        finally:
+            if part_file:
+                part_file.close()
 
-                # Save chunk to file
-                part_filename = f"part_{part_number}.txt"
-                part_path = os.path.join(pdf_dir, part_filename)
+    def process_pdf(self, file) -> PDFSuccessResponse | PDFErrorResponse:
+        """
+        Process uploaded PDF file and save text in 10-page per part
 
-                with open(part_path, 'w', encoding='utf-8') as f:
-                    f.write(chunk_text)
+        The upload is spooled to disk and read page by page, so memory use is
+        bounded by a single page rather than the whole report.
 
-                part_number += 1
-            doc.close()
-            return PDFSuccessResponse(pdf_filename=pdf_filename, total_pages=total_pages)
+        Args:
+            file: FastAPI UploadFile object
 
+        Returns:
+            dict: Processing result with details
+        """
+        try:
+            with self.extract_pages(file, write_parts=True) as (result, pages):
+                for _ in pages:
+                    pass
+            return result
 
         except Exception as e:
             error_message = f"Error occurred while extracting the text from the PDF: {str(e)}"
@@ -0,0 +1,131 @@
+import math
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # Token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+CHAT_INPUT_TOKEN_BUDGET = int(os.getenv("CHAT_INPUT_TOKEN_BUDGET", "6000"))
+CHAT_HISTORY_SHARE = float(os.getenv("CHAT_HISTORY_SHARE", "0.3"))  # Of the budget left after template and query
+CHAT_RECENT_TURNS = int(os.getenv("CHAT_RECENT_TURNS", "2"))  # Chat pairs kept verbatim; older ones are truncated
+CHAT_QUERY_SHARE = float(os.getenv("CHAT_QUERY_SHARE", "0.25"))  # Of the budget, at most, for the (augmented) query
+TRUNCATED_TURN_TOKENS = 40
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """Counts and truncates text in the tokens of an OpenAI model"""
+
+    def __init__(self, model: str):
+        self.encoding = None
+        if tiktoken is not None:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The leading max_tokens tokens of the text, marked with an ellipsis when cut"""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            head = self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:max_tokens])
+        else:
+            head = text[:max_tokens * CHARS_PER_TOKEN]
+            head = head.rsplit(" ", 1)[0] if " " in head else head
+        return f"{head.rstrip()} …"
+
+
+class PromptPacker:
+    """
+    Fits conversation history, retrieved chunks and the query into an input token budget
+
+    The prompt template is always kept, and the query up to query_share of the
+    budget, so a long follow-up cannot crowd out the context. Of the remaining
+    budget, history gets at most history_share: the last recent_turns chat pairs
+    verbatim, older turns truncated to their first tokens, dropping the oldest
+    first. Retrieved chunks fill the rest in rank order; the lowest-ranked chunks
+    that do not fit are dropped.
+    """
+
+    def __init__(self, model: str, budget: int = CHAT_INPUT_TOKEN_BUDGET,
+                 history_share: float = CHAT_HISTORY_SHARE, recent_turns: int = CHAT_RECENT_TURNS,
+                 query_share: float = CHAT_QUERY_SHARE):
+        self.counter = TokenCounter(model)
+        self.budget = budget
+        self.history_share = history_share
+        self.recent_turns = recent_turns
+        self.query_tokens = int(budget * query_share)
+
+    def pack(self, query: str, turns: List[Tuple[str, str]], chunks: List[str],
+             render: Callable[[str, List[Tuple[str, str]], str], str]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Build the prompt within the budget
+
+        Args:
+            query: User query
+            turns: (speaker, message) pairs of the conversation, oldest first
+            chunks: Retrieved chunks, best first
+            render: Builds the prompt from the query, history turns and context text
+
+        Returns:
+            The prompt and packing statistics
+        """
+        packed_query = self.counter.truncate(query, self.query_tokens)
+        query_truncated = packed_query != query
+        query = packed_query
+        available = self.budget - self.counter.count(render(query, [], ""))
+        history, history_tokens, truncated = self._pack_history(turns, int(max(available, 0) * self.history_share))
+
+        context_budget = available - history_tokens
+        context, context_tokens = [], 0
+        for rank, chunk in enumerate(chunks, start=1):
+            entry = f"[{rank}] {chunk}"
+            entry_tokens = self.counter.count(entry) + 1
+            if context_tokens + entry_tokens > context_budget:
+                break
+            context.append(entry)
+            context_tokens += entry_tokens
+
+        prompt = render(query, history, "\n".join(context))
+        return prompt, {
+            "prompt_tokens": self.counter.count(prompt),
+            "budget": self.budget,
+            "chunks_used": len(context),
+            "chunks_retrieved": len(chunks),
+            "turns_kept": len(history),
+            "turns_truncated": truncated,
+            "turns_dropped": len(turns) - len(history),
+            "query_truncated": query_truncated
+        }
+
+    def _pack_history(self, turns: List[Tuple[str, str]], budget: int) -> Tuple[List[Tuple[str, str]], int, int]:
+        """Recent turns verbatim and older turns truncated, oldest dropped until within budget"""
+        recent_count = self.recent_turns * 2
+        history = []
+        for position, (speaker, message) in enumerate(turns):
+            if position < len(turns) - recent_count:
+                message = self.counter.truncate(message, TRUNCATED_TURN_TOKENS)
+            history.append((speaker, message))
+
+        costs = [self.counter.count(f"{speaker}: {message}") + 1 for speaker, message in history]
+        while history and sum(costs) > budget:
+            # Truncate a verbatim turn before dropping it, oldest first
+            speaker, message = history[0]
+            shortened = self.counter.truncate(message, TRUNCATED_TURN_TOKENS)
+            if shortened != message:
+                history[0] = (speaker, shortened)
+                costs[0] = self.counter.count(f"{speaker}: {shortened}") + 1
+            else:
+                history.pop(0)
+                costs.pop(0)
+        originals = turns[len(turns) - len(history):]
+        truncated = sum(1 for kept, original in zip(history, originals) if kept != original)
+        return history, sum(costs), truncated
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+from app.services.batch_service import BatchService
+from app.services.incremental_service import IncrementalService
+from app.services.job_service import JobService
+from app.services.llm_backends import LLMBackend, build_backend
+from app.services.llm_service import LLMService
+from app.services.pdf_service import PDFService, shutdown_extract_pool
+from app.services.table_service import TableService
+from app.services.vector_service import VectorService
+
+logger = logging.getLogger(__name__)
+
+WARMUP_DUMMY_ENCODE = os.getenv("WARMUP_DUMMY_ENCODE", "True").lower() == "true"
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "120"))
+
+
+class ServiceRegistry:
+    """Services shared by every request, built once for the lifetime of the app"""
+
+    def __init__(self):
+        self.pdf_service: PDFService | None = None
+        self.table_service: TableService | None = None
+        self.vector_service: VectorService | None = None
+        self.llm_backend: LLMBackend | None = None
+        self.llm_service: LLMService | None = None
+        self.job_service: JobService | None = None
+        self.incremental_service: IncrementalService | None = None
+        self.batch_service: BatchService | None = None
+        self.started_at: datetime | None = None
+        self.ready_at: datetime | None = None
+        self.warmup_error: str | None = None
+        self._ready = asyncio.Event()
+        self._warmup_task: asyncio.Task | None = None
+
+    def startup(self):
+        """Start the background warmup and return immediately so the server can bind"""
+        self.started_at = datetime.now(timezone.utc)
+        self._ready = asyncio.Event()
+        self._warmup_task = asyncio.create_task(self.warmup())
+
+    async def warmup(self):
+        """Build the vector store client, embedding model and LLM backend off the event loop"""
+        try:
+            self.table_service = TableService()
+            self.pdf_service = PDFService(table_service=self.table_service)
+            self.llm_backend = build_backend()
+            self.vector_service = await asyncio.to_thread(VectorService)
+            await asyncio.to_thread(self.vector_service.warmup, WARMUP_DUMMY_ENCODE)
+            self.llm_service = LLMService(backend=self.llm_backend, vector_service=self.vector_service)
+            self.incremental_service = IncrementalService(self.vector_service, self.llm_service)
+            self.batch_service = BatchService(self.pdf_service, self.vector_service)
+            self.job_service = JobService(self.pdf_service, self.vector_service, self.llm_service)
+            self.job_service.start()
+            self.ready_at = datetime.now(timezone.utc)
+            logger.info(f"Services ready in {(self.ready_at - self.started_at).total_seconds():.2f}s")
+        except Exception as e:
+            self.warmup_error = str(e)
+            logger.error(f"Error in service registry warmup: {str(e)}")
+        finally:
+            self._ready.set()
+
+    async def wait_until_ready(self):
+        """Wait for the warmup to finish; raise 503 if it failed or takes too long"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=READINESS_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Services are still warming up, retry shortly")
+        if not self.is_ready:
+            raise HTTPException(status_code=503, detail=f"Service warmup failed: {self.warmup_error}")
+
+    async def shutdown(self):
+        """Stop a pending warmup and release the shared clients"""
+        if self._warmup_task is not None and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        if self.job_service is not None:
+            await self.job_service.stop()
+        if self.batch_service is not None:
+            await self.batch_service.stop()
+        if self.llm_backend is not None:
+            await self.llm_backend.close()
+        await asyncio.to_thread(shutdown_extract_pool)
+        self.pdf_service = None
+        self.table_service = None
+        self.vector_service = None
+        self.llm_backend = None
+        self.llm_service = None
+        self.job_service = None
+        self.incremental_service = None
+        self.batch_service = None
+
+    @property
+    def is_ready(self) -> bool:
+        return all(service is not None for service in
+                   (self.pdf_service, self.table_service, self.vector_service, self.llm_service, self.job_service,
+                    self.incremental_service, self.batch_service))
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness of each shared service"""
+        return {
+            "ready": self.is_ready,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "ready_at": self.ready_at.isoformat() if self.ready_at else None,
+            "warmup_error": self.warmup_error,
+            "services": {
+                "pdf_service": self.pdf_service is not None,
+                "table_service": self.table_service is not None,
+                "vector_service": self.vector_service is not None,
+                "llm_service": self.llm_service is not None,
+                "job_service": self.job_service is not None,
+                "incremental_service": self.incremental_service is not None,
+                "batch_service": self.batch_service is not None
+            },
+            "llm_backend": f"{self.llm_backend.name}:{self.llm_backend.model}" if self.llm_backend else None,
+            "queued_jobs": self.job_service.queued_count() if self.job_service else 0
+        }
+
+
+registry = ServiceRegistry()
@@ -74,40 +74,64 @@ def show_upload_interface():
 
 
 def handle_summarize_pdf(uploaded_file):
-    """Handle PDF summarization request"""
-    with st.spinner("🔄 Processing PDF and generating summary... This may take a few minutes."):
-        try:
-            # Prepare the file for upload
-            files = {
-                'file': (uploaded_file.name, uploaded_file.getvalue(), 'application/pdf')
-            }
-
-            # Prepare form data with operation parameter
-            data = {
-                'operation': 'summarize'
-            }
+    """Handle PDF summarization request, showing part summaries as they complete"""
+    status = st.status("🔄 Processing PDF and generating summary...", expanded=True)
+    try:
+        # Prepare the file for upload
+        files = {
+            'file': (uploaded_file.name, uploaded_file.getvalue(), 'application/pdf')
+        }
 
-            # Make request to unified endpoint with operation parameter
-            response = requests.post(
-                f'{BASE_URL}/upload-pdf',
-                files=files,
-                data=data,  # Add the operation parameter
-                timeout=300  # 5 minutes timeout
-            )
+        # Prepare form data with operation parameter
+        data = {
+            'operation': 'summarize',
+            'stream': 'true'
+        }
 
-            if response.status_code == 200:
-                result = response.json()
-                st.session_state.summary_result = result
-                st.rerun()
-            else:
+        # Make request to unified endpoint with operation parameter
+        with requests.post(
+            f'{BASE_URL}/upload-pdf',
+            files=files,
+            data=data,  # Add the operation parameter
+            stream=True,
+            timeout=300  # 5 minutes without any event
+        ) as response:
+            if response.status_code != 200:
+                status.update(label="Summarization failed", state="error")
                 st.error(f"Error: {response.status_code} - {response.text}")
+                return
+
+            parts = []
+            for event, payload in iter_sse_events(response):
+                if event == "extracted":
+                    status.write(f"Extracted {payload.get('total_pages')} pages, summarizing parts...")
+                elif event == "part":
+                    parts.append(payload)
+                    first_page, last_page = payload.get('page_range', [None, None])
+                    with status.expander(
+                        f"Part {payload.get('part_index')} of {payload.get('total_parts')} "
+                        f"(pages {first_page}-{last_page}, {payload.get('elapsed_seconds')}s)"
+                    ):
+                        st.markdown(payload.get('summary', ''))
+                elif event == "final":
+                    status.update(label="Summary complete", state="complete", expanded=False)
+                    parts.sort(key=lambda part: part.get('part_index', 0))
+                    st.session_state.summary_result = {**payload, "parts": parts}
+                    st.rerun()
+                elif event == "error":
+                    status.update(label="Summarization failed", state="error")
+                    st.error(f"Error: {payload.get('error', 'Unknown error')}")
+                    return
 
-        except requests.exceptions.Timeout:
-            st.error("Request timed out. The PDF processing is taking longer than expected.")
-        except requests.exceptions.ConnectionError:
-            st.error("Could not connect to the server. Please ensure the API is running.")
-        except Exception as e:
-            st.error(f"An error occurred: {str(e)}")
+    except requests.exceptions.Timeout:
+        status.update(label="Summarization timed out", state="error")
+        st.error("Request timed out. The PDF processing is taking longer than expected.")
+    except requests.exceptions.ConnectionError:
+        status.update(label="Summarization failed", state="error")
+        st.error("Could not connect to the server. Please ensure the API is running.")
+    except Exception as e:
+        status.update(label="Summarization failed", state="error")
+        st.error(f"An error occurred: {str(e)}")
 
 
 def handle_setup_chat(uploaded_file):
@@ -135,7 +159,8 @@ def handle_setup_chat(uploaded_file):
             if response.status_code == 200:
                 result = response.json()
                 if result.get('status') == 'success':
-                    st.session_state.pdf_filename = result.get('pdf_filename', uploaded_file.name)
+                    # The server's document name scopes chat retrieval to this PDF's collection
+                    st.session_state.pdf_filename = result.get('pdf_name') or os.path.splitext(uploaded_file.name)[0]
                     st.session_state.chat_mode = True
                     st.session_state.chat_setup_complete = True
                     st.success("Chat session setup successfully!")
@@ -175,6 +200,12 @@ def show_summary_result():
             st.markdown("#### Complete WASDE Analysis")
             st.markdown(summary_content)
 
+            # Part summaries, when the summary was streamed
+            for part in st.session_state.summary_result.get('parts', []):
+                first_page, last_page = part.get('page_range', [None, None])
+                with st.expander(f"Part {part.get('part_index')} (pages {first_page}-{last_page})"):
+                    st.markdown(part.get('summary', ''))
+
             # Download button for the summary
             st.download_button(
                 label="📥 Download Summary",
@@ -218,11 +249,9 @@ def show_chat_interface():
             with st.chat_message("user"):
                 st.markdown(prompt)
 
-            # Generate assistant response
+            # Generate assistant response, rendering tokens as they arrive
             with st.chat_message("assistant"):
-                with st.spinner("Thinking..."):
-                    response = handle_chat_message(prompt)
-                    st.markdown(response)
+                response = st.write_stream(handle_chat_message_stream(prompt))
 
             # Add assistant response to chat history
             st.session_state.chat_messages.append({"role": "assistant", "content": response})
@@ -235,7 +264,6 @@ def handle_chat_message(user_message):
     try:
         # Get PDF filename from session state
         pdf_name = st.session_state.get('pdf_filename', 'Document')
-        pdf_name = pdf_name.split('.')[0]
 
         # Prepare chat payload according to ChatPayload model
         chat_payload = {
@@ -282,6 +310,65 @@ def handle_chat_message(user_message):
         return f"Sorry, I encountered an unexpected error: {str(e)}"
 
 
+def iter_sse_events(response):
+    """Parse a server-sent events response into (event, data) pairs"""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def handle_chat_message_stream(user_message):
+    """Stream the chat response token by token from the streaming chat API"""
+    try:
+        # Get PDF filename from session state
+        pdf_name = st.session_state.get('pdf_filename', 'Document')
+
+        # Prepare chat payload according to ChatPayload model
+        chat_payload = {
+            "file_name": pdf_name,
+            "query": user_message
+        }
+
+        # Make request to the streaming chat endpoint
+        with requests.post(
+            f'{BASE_URL}/chat/stream',
+            json=chat_payload,
+            stream=True,
+            timeout=60
+        ) as response:
+            if response.status_code != 200:
+                yield f"Sorry, I couldn't process your request. Server returned status code: {response.status_code}"
+                return
+
+            for event, data in iter_sse_events(response):
+                if event == "token":
+                    yield data.get('delta', '')
+                elif event == "error":
+                    yield f"Sorry, I encountered an issue: {data.get('error', 'Unknown error occurred')}"
+
+    except requests.exceptions.Timeout:
+        yield "Sorry, the request took too long to process. Please try again with a shorter question."
+
+    except requests.exceptions.ConnectionError:
+        yield "Sorry, I couldn't connect to the chat service. Please ensure the API server is running."
+
+    except requests.exceptions.RequestException as e:
+        yield f"Sorry, there was a network error: {str(e)}"
+
+    except json.JSONDecodeError:
+        yield "Sorry, I received an invalid response from the server. Please try again."
+
+    except Exception as e:
+        yield f"Sorry, I encountered an unexpected error: {str(e)}"
+
+
 def add_sidebar_info():
     """Add information sidebar"""
     with st.sidebar:
@@ -0,0 +1,456 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+YEAR_PATTERN = re.compile(r"^(\d{4}/\d{2})\s*(?:\(?\s*(Est\.|Proj\.)\s*\)?)?$")
+NUMBER_PATTERN = re.compile(r"^-?\d{1,3}(?:,\d{3})*(?:\.\d+)?(?:\s*\*)?$|^-?\d+(?:\.\d+)?(?:\s*\*)?$")
+MONTH_PATTERN = re.compile(r"^(Jan|Feb|Mar|Apr|May|Jun|June|Jul|July|Aug|Sep|Oct|Nov|Dec)\.?$")
+TITLE_PATTERN = re.compile(r"^(U\.S\.|World|Mexico)\s+(.+?)\s+Supply and Use\b")
+FOOTNOTE_PATTERN = re.compile(r"\s*\d+/\s*")
+FOOTNOTE_LINE_PATTERN = re.compile(r"^(?:\d+/|/\d+)$")
+UNIT_PATTERN = re.compile(r"^\(?((?:(?:Million|Thousand|Billion)\b[^()]*?)?"
+                          r"(?:Acres|Bushels|Metric Tons|Short Tons|Pounds|Bales|Hundredweight|Cwt))\)?$", re.IGNORECASE)
+
+# Column headers of the world tables; a header is split over several lines, so they are matched in the joined text
+WORLD_ATTRIBUTES = [
+    "Beginning Stocks", "Ending Stocks", "Domestic Feed", "Domestic Total", "Total Domestic", "Domestic Crush",
+    "Domestic Use", "Domestic Food", "Total Use", "Production", "Imports", "Exports", "Loss"
+]
+WORLD_ATTRIBUTE_PATTERN = re.compile("|".join(re.escape(name).replace(r"\ ", r"\s+") for name in WORLD_ATTRIBUTES))
+
+COLUMNS = ("commodity", "region", "marketing_year", "attribute", "variant", "unit")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+REGION_ALIASES = {"u.s.": "United States", "usa": "United States"}
+QUESTION_MONTH_PATTERN = re.compile(r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|june?|july?|aug(?:ust)?"
+                                    r"|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b")
+# "may" is also a verb, so it is a month only next to a year or a projection
+QUESTION_MAY_PATTERN = re.compile(r"\bmay\b(?=\s+(?:\d{4}|proj))|(?:\d{4}(?:/\d{2})?|proj(?:\.|ection)?)\s+may\b")
+
+
+def _label(text: str) -> str:
+    """Row label without footnote markers and padding"""
+    return re.sub(r"\s+", " ", FOOTNOTE_PATTERN.sub(" ", text)).strip(" ,:")
+
+
+def _normalize(label: str) -> str:
+    """
+    Matching key of a label: case and a plural "s" are ignored ("Soybeans" == "soybean")
+
+    >>> [_normalize(label) for label in ("Stocks", "Soybeans", "Loss", "Ending Stocks")]
+    ['stock', 'soybean', 'loss', 'ending stock']
+    """
+    label = label.lower()
+    return label[:-1] if label.endswith("s") and not label.endswith("ss") else label
+
+
+def _question_month(text: str) -> Optional[str]:
+    """
+    Three-letter month named by a lowercase question, ignoring words that merely start like one
+
+    >>> [_question_month(q) for q in ("corn ending stocks for marketing year 2025/26", "corn stocks june",
+    ...                               "wheat 2025/26 may", "exports may decrease", "proj. dec soybeans")]
+    [None, 'jun', 'may', None, 'dec']
+    """
+    month = QUESTION_MONTH_PATTERN.search(text)
+    if month:
+        return month.group(1)[:3]
+    return "may" if QUESTION_MAY_PATTERN.search(text) else None
+
+
+def _number(text: str) -> float:
+    return float(text.replace(",", "").replace("*", "").strip())
+
+
+class TableParser:
+    """
+    Parses WASDE supply and use tables out of page text (one table cell per line).
+
+    Two layouts are recognised: U.S. tables, with attributes as rows and marketing
+    years as columns, and world tables, with regions as rows and attributes as
+    columns under a marketing-year heading.
+    """
+
+    def parse_page(self, page_number: int, text: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one record per table cell found on the page
+
+        Args:
+            page_number: 1-based page number
+            text: Text of the page
+
+        Yields:
+            Dicts with commodity, region, marketing_year, attribute, variant, unit, value and page
+        """
+        lines = [line.strip() for line in text.splitlines()]
+        # Footnote markers on a line of their own ("3/") sit between the cells of a row
+        lines = [line for line in lines if line and not FOOTNOTE_LINE_PATTERN.match(line)]
+        index = 0
+        while index < len(lines):
+            match = TITLE_PATTERN.match(lines[index])
+            if not match:
+                index += 1
+                continue
+            region = "United States" if match.group(1) == "U.S." else match.group(1)
+            commodity = _label(match.group(2)).lower()
+            end = index + 1
+            while end < len(lines) and not TITLE_PATTERN.match(lines[end]) and not lines[end].startswith("Note:"):
+                end += 1
+            table = lines[index + 1:end]
+            if region == "World":
+                yield from self._parse_world_table(page_number, commodity, table)
+            else:
+                yield from self._parse_column_table(page_number, commodity, region, table)
+            index = end
+
+    def _parse_column_table(self, page_number: int, commodity: str, region: str,
+                            lines: List[str]) -> Iterator[Dict[str, Any]]:
+        """Attributes as rows, marketing years as columns"""
+        columns: List[Tuple[str, str]] = []
+        unit = ""
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+
+            # A run of marketing-year headers starts a new block, possibly under a commodity heading
+            if YEAR_PATTERN.match(line):
+                if index > 0 and lines[index - 1].isupper() and not NUMBER_PATTERN.match(lines[index - 1]):
+                    commodity = _label(lines[index - 1]).lower()
+                years = []
+                while index < len(lines) and YEAR_PATTERN.match(lines[index]):
+                    years.append(YEAR_PATTERN.match(lines[index]).groups())
+                    index += 1
+                months = []
+                while index < len(lines) and MONTH_PATTERN.match(lines[index]):
+                    months.append(lines[index][:3])
+                    index += 1
+                # Months label the trailing (projection) columns
+                variants = [kind or "" for _, kind in years]
+                for offset, month in enumerate(months):
+                    position = len(years) - len(months) + offset
+                    if position >= 0:
+                        variants[position] = f"{variants[position]} {month}".strip()
+                columns = [(year, variant) for (year, _), variant in zip(years, variants)]
+                continue
+
+            unit_match = UNIT_PATTERN.match(line)
+            if unit_match:
+                unit = " ".join(unit_match.group(1).split())
+                index += 1
+                continue
+
+            values = lines[index + 1:index + 1 + len(columns)]
+            if columns and not NUMBER_PATTERN.match(line) and len(values) == len(columns) \
+                    and all(NUMBER_PATTERN.match(value) for value in values):
+                attribute = _label(line)
+                for (year, variant), value in zip(columns, values):
+                    yield self._record(commodity, region, year, attribute, variant, unit, _number(value), page_number)
+                index += 1 + len(columns)
+                continue
+            index += 1
+
+    def _parse_world_table(self, page_number: int, commodity: str, lines: List[str]) -> Iterator[Dict[str, Any]]:
+        """Regions as rows, attributes as columns, grouped under marketing-year headings"""
+        year, kind, unit = "", "", ""
+        attributes: List[str] = []
+        index = 0
+        while index < len(lines):
+            line = lines[index]
+
+            year_match = YEAR_PATTERN.match(line)
+            if year_match:
+                year, kind = year_match.group(1), year_match.group(2) or ""
+                # The attribute headers follow the year heading until the first data row
+                header = []
+                index += 1
+                while index < len(lines) and not self._is_row_start(lines, index):
+                    header.append(lines[index])
+                    index += 1
+                # Footnote markers can land inside a header ("Domestic / Total 2")
+                header_text = re.sub(r"[\d/]+", " ", " ".join(header))
+                found = [" ".join(name.split()) for name in WORLD_ATTRIBUTE_PATTERN.findall(header_text)]
+                if found:
+                    attributes = found
+                continue
+
+            unit_match = UNIT_PATTERN.match(line)
+            if unit_match and not attributes:
+                unit = " ".join(unit_match.group(1).split())
+                index += 1
+                continue
+
+            if attributes and self._is_row_start(lines, index):
+                region = _label(line)
+                index += 1
+                while index < len(lines):
+                    variant = kind
+                    if MONTH_PATTERN.match(lines[index]):
+                        variant = f"{kind} {lines[index][:3]}".strip()
+                        index += 1
+                    values = lines[index:index + len(attributes) + 1]
+                    # Exactly one value per attribute, otherwise the header was misread
+                    if len(values) < len(attributes) or not all(NUMBER_PATTERN.match(value) for value in values[:-1]) \
+                            or (len(values) > len(attributes) and NUMBER_PATTERN.match(values[-1])):
+                        break
+                    values = values[:len(attributes)]
+                    for attribute, value in zip(attributes, values):
+                        yield self._record(commodity, region, year, attribute, variant, unit, _number(value), page_number)
+                    index += len(attributes)
+                    if index >= len(lines) or not MONTH_PATTERN.match(lines[index]):
+                        break
+                continue
+            index += 1
+
+    @staticmethod
+    def _is_row_start(lines: List[str], index: int) -> bool:
+        """A label line followed by numbers, optionally after a month line"""
+        line = lines[index]
+        if NUMBER_PATTERN.match(line) or MONTH_PATTERN.match(line) or YEAR_PATTERN.match(line):
+            return False
+        following = lines[index + 1:index + 3]
+        if following and MONTH_PATTERN.match(following[0]):
+            following = following[1:]
+        return bool(following) and bool(NUMBER_PATTERN.match(following[0]))
+
+    @staticmethod
+    def _record(commodity, region, year, attribute, variant, unit, value, page_number) -> Dict[str, Any]:
+        return {
+            "commodity": commodity,
+            "region": region,
+            "marketing_year": year,
+            "attribute": attribute,
+            "variant": variant,
+            "unit": unit,
+            "value": value,
+            "page": page_number
+        }
+
+
+class ColumnarTable:
+    """
+    Table cells of one document stored column-wise
+
+    Label columns are dictionary encoded: each holds int32 codes into a
+    vocabulary of distinct labels, so a filter is a vectorised comparison.
+    """
+
+    def __init__(self, vocabularies: Dict[str, List[str]], codes: Dict[str, np.ndarray],
+                 values: np.ndarray, pages: np.ndarray):
+        self.vocabularies = vocabularies
+        self.codes = codes
+        self.values = values
+        self.pages = pages
+        # Labels with the same key ("Ending Stocks", "Ending stocks") are matched together
+        self._lookup: Dict[str, Dict[str, List[int]]] = {column: {} for column in vocabularies}
+        for column, labels in vocabularies.items():
+            for code, label in enumerate(labels):
+                self._lookup[column].setdefault(_normalize(label), []).append(code)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "ColumnarTable":
+        vocabularies: Dict[str, List[str]] = {column: [] for column in COLUMNS}
+        positions: Dict[str, Dict[str, int]] = {column: {} for column in COLUMNS}
+        codes: Dict[str, List[int]] = {column: [] for column in COLUMNS}
+        values, pages = [], []
+        for record in records:
+            for column in COLUMNS:
+                label = record[column]
+                code = positions[column].setdefault(label, len(vocabularies[column]))
+                if code == len(vocabularies[column]):
+                    vocabularies[column].append(label)
+                codes[column].append(code)
+            values.append(record["value"])
+            pages.append(record["page"])
+        return cls(
+            vocabularies,
+            {column: np.asarray(codes[column], dtype=np.int32) for column in COLUMNS},
+            np.asarray(values, dtype=np.float64),
+            np.asarray(pages, dtype=np.int16)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ColumnarTable":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                {column: data[f"{column}_labels"].tolist() for column in COLUMNS},
+                {column: data[f"{column}_codes"] for column in COLUMNS},
+                data["values"],
+                data["pages"]
+            )
+
+    def save(self, path: str):
+        arrays = {"values": self.values, "pages": self.pages}
+        for column in COLUMNS:
+            arrays[f"{column}_labels"] = np.asarray(self.vocabularies[column], dtype=str)
+            arrays[f"{column}_codes"] = self.codes[column]
+        # Unique per writer: the same document may be uploaded by concurrent requests
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def codes_of(self, column: str, label: str) -> List[int]:
+        """Codes of a label (case and plural insensitive); empty if it does not occur"""
+        return self._lookup[column].get(_normalize(label), [])
+
+    def select(self, **filters: Optional[str]) -> np.ndarray:
+        """Row indices matching every given column label; unknown labels match nothing"""
+        mask = np.ones(len(self.values), dtype=bool)
+        for column, label in filters.items():
+            if label is None:
+                continue
+            codes = self.codes_of(column, label)
+            if not codes:
+                return np.empty(0, dtype=np.int64)
+            mask &= np.isin(self.codes[column], codes)
+        return np.flatnonzero(mask)
+
+    def rows(self, indices: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {
+                **{column: self.vocabularies[column][self.codes[column][index]] for column in COLUMNS},
+                "value": float(self.values[index]),
+                "page": int(self.pages[index])
+            }
+            for index in indices
+        ]
+
+
+class TableService:
+    """Structured WASDE tables: extracted alongside the page text and queried without the LLM"""
+
+    def __init__(self, tables_dir: str = "app/utils/tables"):
+        self.tables_dir = tables_dir
+        self.parser = TableParser()
+        self._tables: Dict[str, ColumnarTable] = {}
+        self._lock = threading.Lock()
+        os.makedirs(self.tables_dir, exist_ok=True)
+
+    def _table_path(self, pdf_name: str) -> str:
+        return os.path.join(self.tables_dir, f"{pdf_name}.npz")
+
+    def extract(self, pdf_name: str, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """
+        Parse the tables of each page while passing the pages through
+
+        The columnar table is built and saved once every page has been consumed.
+
+        Args:
+            pdf_name: PDF filename without extension
+            pages: Iterator of (page_number, text)
+
+        Yields:
+            The pages, unchanged
+        """
+        records = []
+        for page_number, text in pages:
+            records.extend(self.parser.parse_page(page_number, text))
+            yield page_number, text
+        self.store(pdf_name, ColumnarTable.from_records(records))
+
+    def store(self, pdf_name: str, table: ColumnarTable):
+        table.save(self._table_path(pdf_name))
+        with self._lock:
+            self._tables[pdf_name] = table
+
+    def get_table(self, pdf_name: str) -> Optional[ColumnarTable]:
+        """Table of a document, loaded from disk on first use"""
+        with self._lock:
+            table = self._tables.get(pdf_name)
+            if table is None and os.path.exists(self._table_path(pdf_name)):
+                table = self._tables[pdf_name] = ColumnarTable.load(self._table_path(pdf_name))
+            return table
+
+    def lookup(self, pdf_name: str, commodity: str | None = None, region: str | None = None,
+               marketing_year: str | None = None, attribute: str | None = None,
+               variant: str | None = None) -> List[Dict[str, Any]]:
+        """
+        Table cells of a document matching the given labels
+
+        Args:
+            pdf_name: PDF filename without extension
+            commodity: e.g. "corn"
+            region: e.g. "United States", "World", "Brazil"
+            marketing_year: e.g. "2025/26"
+            attribute: e.g. "Ending Stocks"
+            variant: e.g. "Proj. Jun"
+
+        Returns:
+            Matching cells with their labels, value, unit and page
+        """
+        table = self.get_table(pdf_name)
+        if table is None:
+            return []
+        indices = table.select(commodity=commodity, region=region, marketing_year=marketing_year,
+                               attribute=attribute, variant=variant)
+        return table.rows(indices)
+
+    def answer(self, pdf_name: str, question: str) -> Dict[str, Any]:
+        """
+        Answer a direct numeric question ("corn ending stocks 2025/26") from the table
+
+        The commodity, attribute, region and marketing year are matched against the
+        labels of the document; a question naming no commodity or attribute is not
+        answered, so the caller can fall back to the LLM.
+
+        Args:
+            pdf_name: PDF filename without extension
+            question: User question
+
+        Returns:
+            dict with success, the matched filters, the cells and a short answer
+        """
+        table = self.get_table(pdf_name)
+        if table is None:
+            return {"success": False, "error": f"No tables extracted for {pdf_name}"}
+
+        text = f" {question.lower()} "
+        filters = {
+            "commodity": self._match_label(table, "commodity", text),
+            "attribute": self._match_label(table, "attribute", text),
+            "region": self._match_label(table, "region", text) or self._match_region_alias(text),
+            "marketing_year": next((year for year in re.findall(r"\d{4}/\d{2}", text)
+                                    if table.codes_of("marketing_year", year)), None)
+        }
+        if filters["commodity"] is None or filters["attribute"] is None:
+            return {"success": False, "error": "Question does not name a commodity and attribute of the tables",
+                    "filters": filters}
+        if filters["region"] is None:
+            filters["region"] = "United States"
+
+        cells = self.lookup(pdf_name, **filters)
+        # "June" picks the June projection column; other columns carry no month and are kept
+        month = _question_month(text)
+        if month:
+            cells = [cell for cell in cells if not cell["variant"].endswith(MONTHS)
+                     or cell["variant"].lower().endswith(month)]
+        if not cells:
+            return {"success": False, "error": "No table values match the question", "filters": filters}
+
+        lines = [
+            f"{cell['region']} {cell['commodity']} {cell['attribute']}, {cell['marketing_year']}"
+            f"{' ' + cell['variant'] if cell['variant'] else ''}: {cell['value']:,g} {cell['unit']} (page {cell['page']})"
+            for cell in cells
+        ]
+        return {"success": True, "filters": filters, "results": cells, "answer": "\n".join(lines)}
+
+    @staticmethod
+    def _match_label(table: ColumnarTable, column: str, text: str) -> Optional[str]:
+        """Longest label of the column that occurs in the text as whole words"""
+        best = None
+        for label in table.vocabularies[column]:
+            key = _normalize(label)
+            if re.search(rf"(?<![a-z]){re.escape(key)}s?(?![a-z])", text) and (best is None or len(label) > len(best)):
+                best = label
+        return best
+
+    @staticmethod
+    def _match_region_alias(text: str) -> Optional[str]:
+        for alias, region in REGION_ALIASES.items():
+            if re.search(rf"(?<![a-z]){re.escape(alias)}(?![a-z])", text):
+                return region
+        return None
@@ -1,38 +1,113 @@
+import hashlib
 import os
 import re
-import uuid
+import threading
+import time
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
 import chromadb
-import nltk
 from chromadb.config import Settings
 from dotenv import load_dotenv
-from nltk.data import find
-from nltk.tokenize import sent_tokenize
-from sentence_transformers import SentenceTransformer
 
 from app.pydantics.models import PDFSuccessResponse
+from app.services.cache_service import EmbeddingCache, RetrievalCache
+from app.services.chunking_service import ChunkingService, normalize_text, page_fingerprint, strip_volatile_lines
+from app.services.keyword_service import KeywordIndex
+from app.services.metrics_service import metrics
 
 load_dotenv()
 
 EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL')
-CURRENT_EMBEDDING_MODEL = SentenceTransformer(EMBEDDING_MODEL)
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE', 'True').lower() == 'true'
+
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+VECTOR_WRITE_BATCH_SIZE = int(os.getenv('VECTOR_WRITE_BATCH_SIZE', '256'))
+
+# "auto" answers short keyword lookups lexically and everything else with hybrid search
+SEARCH_MODE = os.getenv('SEARCH_MODE', 'auto')
+KEYWORD_LOOKUP_MAX_TERMS = int(os.getenv('KEYWORD_LOOKUP_MAX_TERMS', '4'))
+HYBRID_CANDIDATES = int(os.getenv('HYBRID_CANDIDATES', '4'))  # Candidates per retriever, as a multiple of top_k
+RRF_K = 60
+
+# The embedding model and its cache are loaded on first use (or by the startup warmup),
+# so importing this module does not pay for the torch import and the model load.
+CURRENT_EMBEDDING_MODEL = None
+EMBEDDING_CACHE = None
+CHUNKING_SERVICE = None
+_MODEL_LOCK = threading.Lock()
+
+
+def get_embedding_model():
+    """Load the SentenceTransformer model once and return the shared instance"""
+    global CURRENT_EMBEDDING_MODEL
+    if CURRENT_EMBEDDING_MODEL is None:
+        with _MODEL_LOCK:
+            if CURRENT_EMBEDDING_MODEL is None:
+                from sentence_transformers import SentenceTransformer
+                CURRENT_EMBEDDING_MODEL = SentenceTransformer(EMBEDDING_MODEL)
+    return CURRENT_EMBEDDING_MODEL
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Open the shared embedding cache once, or return None when it is disabled"""
+    global EMBEDDING_CACHE
+    if EMBEDDING_CACHE is None and EMBEDDING_CACHE_ENABLED:
+        with _MODEL_LOCK:
+            if EMBEDDING_CACHE is None:
+                EMBEDDING_CACHE = EmbeddingCache(EMBEDDING_MODEL)
+    return EMBEDDING_CACHE
+
+
+def get_chunking_service() -> ChunkingService:
+    """Build the chunker on the embedding model's tokenizer once and return the shared instance"""
+    global CHUNKING_SERVICE
+    if CHUNKING_SERVICE is None:
+        model = get_embedding_model()
+        with _MODEL_LOCK:
+            if CHUNKING_SERVICE is None:
+                CHUNKING_SERVICE = ChunkingService.for_model(model)
+    return CHUNKING_SERVICE
 
 
 class VectorService:
     def __init__(self):
         self.utils_dir = "app/utils"
         self.ensure_utils_directory()
-        self.embedding_model = CURRENT_EMBEDDING_MODEL
         self.persist_db = os.getenv('VECTOR_PERSIST', 'False').lower() == 'true'
+        self.retrieval_cache = RetrievalCache()
+        self.keyword_index = KeywordIndex()
         self._initialize_chromadb()
-        self._ensure_nltk_data()
+
+    @property
+    def embedding_model(self):
+        return get_embedding_model()
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache | None:
+        return get_embedding_cache()
+
+    @property
+    def chunking_service(self) -> ChunkingService:
+        return get_chunking_service()
 
     def ensure_utils_directory(self):
         """Ensure the utils directory exists"""
         os.makedirs(self.utils_dir, exist_ok=True)
 
+    def warmup(self, dummy_encode: bool = True):
+        """
+        Load the embedding model and its cache ahead of the first request.
+
+        Args:
+            dummy_encode: Run one throwaway encode so lazy kernel setup happens now
+        """
+        model = get_embedding_model()
+        get_embedding_cache()
+        get_chunking_service()
+        if dummy_encode:
+            model.encode(["warmup"], convert_to_tensor=False, show_progress_bar=False)
+
     def _initialize_chromadb(self):
         """Initialize ChromaDB with configurable persistence"""
         try:
@@ -57,66 +132,93 @@ class VectorService:
                     )
                 )
 
-            # Get or create collection
+            # Shared collection of earlier versions, still searched for documents ingested into it
             self.collection = self.chroma_client.get_or_create_collection(
                 name="pdf_documents",
                 metadata={"description": "PDF document chunks for RAG"}
             )
+            # Each document gets its own collection, cached here by pdf_name
+            self._collections = {}
         except Exception as e:
             raise e
 
-    def _ensure_nltk_data(self):
-        """Ensure required NLTK data is available"""
-        try:
-            find("tokenizers/punkt")
-            find("tokenizers/punkt/english.pickle")
-            find("tokenizers/punkt_tab")
-        except LookupError:
-            nltk.download("punkt")
-            nltk.download("punkt_tab")
+    @staticmethod
+    def collection_name(pdf_name: str) -> str:
+        """ChromaDB-safe collection name for a document"""
+        slug = re.sub(r"[^A-Za-z0-9._-]+", "-", pdf_name)[:48].strip("._-")
+        digest = hashlib.sha1(pdf_name.encode("utf-8")).hexdigest()[:8]
+        return f"pdf-{slug}-{digest}" if slug else f"pdf-{digest}"
+
+    def get_collection(self, pdf_name: str, create: bool = True):
+        """
+        Collection holding the chunks of one document.
+
+        Args:
+            pdf_name: Name of the PDF
+            create: Create the collection if it does not exist yet
+
+        Returns:
+            The ChromaDB collection, or None when it does not exist and create is False
+        """
+        collection = self._collections.get(pdf_name)
+        if collection is not None:
+            return collection
+        name = self.collection_name(pdf_name)
+        if create:
+            collection = self.chroma_client.get_or_create_collection(
+                name=name,
+                metadata={"description": "PDF document chunks for RAG", "pdf_name": pdf_name}
+            )
+        else:
+            try:
+                collection = self.chroma_client.get_collection(name=name)
+            except Exception:
+                return None
+        self._collections[pdf_name] = collection
+        return collection
+
+    def _document_collections(self) -> List[Any]:
+        """All per-document collections"""
+        return [
+            self.chroma_client.get_collection(name=collection.name)
+            for collection in self.chroma_client.list_collections()
+            if collection.name.startswith("pdf-")
+        ]
 
     def clean_text(self, text: str) -> str:
-        """Clean unnecessary spaces, tabs, and invisible characters."""
-        text = text.replace("\u200b", "")  # Remove Zero Width Space
-        text = re.sub(r"\n+", " ", text)  # Replace multiple newlines with space
-        text = re.sub(r"\t+", " ", text)  # Remove tabs
-        text = re.sub(r"\s{2,}", " ", text).strip()  # Remove multiple spaces
-        return text
-
-    def tokenize_sentences(self, text: str, min_tokens: int = 300, max_tokens: int = 500) -> List[str]:
+        """Clean unnecessary spaces, tabs, and invisible characters in a single pass."""
+        return normalize_text(text)
+
+    def tokenize_sentences(self, text: str) -> List[str]:
         """
-        Tokenize and split text into chunks based on token limits.
+        Split text into chunks of embedding-model tokens.
 
         Args:
-            text: Input text to tokenize
-            min_tokens: Minimum tokens per chunk
-            max_tokens: Maximum tokens per chunk
+            text: Cleaned input text
 
         Returns:
             List of text chunks
         """
         try:
-            sentences = sent_tokenize(text)
-            chunks, current_chunk, current_token_count = [], [], 0
-
-            for sentence in sentences:
-                token_count = len(sentence.split())
+            return self.chunking_service.chunk_text(text)
+        except Exception as e:
+            raise e
 
-                if current_token_count + token_count > max_tokens:
-                    if current_token_count >= min_tokens:
-                        chunks.append(" ".join(current_chunk))
-                    current_chunk, current_token_count = [sentence], token_count
-                else:
-                    current_chunk.append(sentence)
-                    current_token_count += token_count
+    def iter_chunks(self, texts: Iterable[str]) -> Iterator[str]:
+        """
+        Split a stream of cleaned texts into chunks of embedding-model tokens.
 
-            if current_chunk:
-                chunks.append(" ".join(current_chunk))
+        Chunk size, the minimum size before a sentence boundary is preferred and
+        the overlap between chunks are configured on the chunking service
+        (CHUNK_MAX_TOKENS, CHUNK_MIN_TOKENS, CHUNK_OVERLAP_TOKENS).
 
-            return chunks
+        Args:
+            texts: Cleaned input texts, in document order
 
-        except Exception as e:
-            raise e
+        Yields:
+            Text chunks
+        """
+        return self.chunking_service.iter_chunks(texts)
 
     def get_text_embedding(self, text: str) -> List[float]:
         """
@@ -129,11 +231,58 @@ class VectorService:
             List of embedding values
         """
         try:
-            embedding = self.embedding_model.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
+            return self.get_text_embeddings([text])[0]
         except Exception as e:
             raise e
 
+    def get_text_embeddings(self, texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+        """
+        Generate embeddings for many texts in batched forward passes.
+
+        Texts already present in the embedding cache are not re-encoded.
+
+        Args:
+            texts: Input texts to embed
+            batch_size: Number of texts encoded per forward pass
+
+        Returns:
+            List of embeddings, in the same order as the input texts
+        """
+        try:
+            if not texts:
+                return []
+            if self.embedding_cache is None:
+                return self._encode(texts, batch_size).tolist()
+
+            embeddings = self.embedding_cache.get_many(texts)
+            missing = [index for index, embedding in enumerate(embeddings) if embedding is None]
+            metrics.cache_lookup("embedding", len(texts) - len(missing), len(missing))
+            if missing:
+                missing_texts = [texts[index] for index in missing]
+                encoded = self._encode(missing_texts, batch_size)
+                self.embedding_cache.put_many(missing_texts, encoded)
+                for index, embedding in zip(missing, encoded):
+                    embeddings[index] = embedding
+            return [embedding.tolist() for embedding in embeddings]
+        except Exception as e:
+            raise e
+
+    def _encode(self, texts: List[str], batch_size: int):
+        """Run the SentenceTransformer forward pass and return a float array"""
+        metrics.embedding_texts.inc(len(texts))
+        with metrics.embedding_batch_seconds.time():
+            return self.embedding_model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_tensor=False,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+
+    def embedding_cache_stats(self) -> Dict[str, Any] | None:
+        """Hit/miss counters of the embedding cache, or None when it is disabled"""
+        return self.embedding_cache.stats() if self.embedding_cache is not None else None
+
     def vectorize_nudge(self, pdf_data: PDFSuccessResponse) -> Dict[str, Any]:
         """
         Process PDF files and store them as vectors in ChromaDB.
@@ -146,8 +295,6 @@ class VectorService:
         """
         try:
             pdf_name = pdf_data.pdf_filename
-            total_pages = pdf_data.total_pages
-
 
             # Find PDF directory
             pdf_dir = os.path.join(self.utils_dir, pdf_name)
@@ -155,28 +302,46 @@ class VectorService:
             if not os.path.exists(pdf_dir):
                 raise FileNotFoundError(f"PDF directory not found: {pdf_dir}")
 
-            # Read all part files and combine content
-            pdf_content = self._read_all_pdf_parts(pdf_dir)
-
-            if not pdf_content.strip():
-                raise ValueError(f"No content found in PDF directory: {pdf_dir}")
-
-            # Process and store in ChromaDB
-            result = self._process_and_store_chunks(
-                pdf_content=pdf_content,
-                pdf_name=pdf_name,
-                total_pages=total_pages
-            )
+            # Stream the cleaned part files through the chunker into ChromaDB
+            return self._vectorize_chunks(pdf_data, self.iter_chunks(self._iter_pdf_parts(pdf_dir)))
 
+        except Exception as e:
             return {
-                "status": "success",
-                "pdf_name": pdf_name,
-                "total_pages": total_pages,
-                "chunks_created": result['chunks_created'],
-                "chunks_stored": result['chunks_stored'],
-                "persistence_mode": "persistent" if self.persist_db else "in-memory"
+                "status": "error",
+                "error": str(e),
+                "pdf_name": pdf_data.pdf_filename
             }
 
+    def vectorize_pages(self, pdf_data: PDFSuccessResponse, pages: Iterable[Tuple[int, str]],
+                        incremental: bool = False, reuse_from: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Chunk, embed and store extracted pages directly, without part files.
+
+        In incremental mode each page is chunked on its own, without its running
+        headers, and its chunks are tagged with the page fingerprint. A page whose
+        number and fingerprint match a page of the reuse_from document (typically
+        the previous issue of the same report) takes that page's chunks and
+        embeddings as they are, so only changed pages are chunked and embedded.
+
+        Args:
+            pdf_data: Dictionary containing 'pdf_name' and 'total_pages'
+            pages: (page_number, text) pairs, in page order
+            incremental: Chunk page by page and reuse unchanged pages
+            reuse_from: Previously ingested document to reuse unchanged pages from
+
+        Returns:
+            Dict with processing results
+        """
+        try:
+            if incremental:
+                page_stats = {"pages_reused": 0, "pages_changed": 0}
+                chunks = self._iter_page_chunks(pages, reuse_from, page_stats)
+                result = self._vectorize_chunks(pdf_data, chunks)
+                result.update(page_stats, reused_from=reuse_from)
+                return result
+
+            return self._vectorize_chunks(pdf_data, self.chunk_pages(pages))
+
         except Exception as e:
             return {
                 "status": "error",
@@ -184,136 +349,389 @@ class VectorService:
                 "pdf_name": pdf_data.pdf_filename
             }
 
-    def _read_all_pdf_parts(self, pdf_dir: str) -> str:
+    def chunk_pages(self, pages: Iterable[Tuple[int, str]]) -> Iterator[str]:
+        """Chunks of a stream of extracted pages, with the page markers the chunks carry"""
+        texts = (self.clean_text(f"--- PAGE {page_number} ---\n{text}") for page_number, text in pages)
+        return self.iter_chunks(texts)
+
+    def _iter_page_chunks(self, pages: Iterable[Tuple[int, str]], reuse_from: Optional[str],
+                          page_stats: Dict[str, int]) -> Iterator[Tuple[str, Dict[str, Any], Optional[List[float]]]]:
+        """
+        Chunks of each page with their page metadata, reused from another document when the page is unchanged
+
+        Yields:
+            (chunk text, page metadata, embedding or None when it still has to be computed)
+        """
+        previous = self._page_chunks(reuse_from) if reuse_from else {}
+        for page_number, text in pages:
+            fingerprint = page_fingerprint(text)
+            reused = previous.get((page_number, fingerprint))
+            if reused:
+                page_stats["pages_reused"] += 1
+                metadata = {"page_number": page_number, "page_fingerprint": fingerprint, "page_chunks": len(reused)}
+                for chunk_text, embedding in reused:
+                    yield chunk_text, metadata, embedding
+                continue
+
+            page_stats["pages_changed"] += 1
+            cleaned = self.clean_text(f"--- PAGE {page_number} ---\n{strip_volatile_lines(text)}")
+            page_chunks = list(self.iter_chunks([cleaned]))
+            metadata = {"page_number": page_number, "page_fingerprint": fingerprint, "page_chunks": len(page_chunks)}
+            for chunk_text in page_chunks:
+                yield chunk_text, metadata, None
+
+    def _page_chunks(self, pdf_name: str) -> Dict[Tuple[int, str], List[Tuple[str, List[float]]]]:
+        """Chunks and embeddings of an incrementally ingested document, by (page number, page fingerprint)"""
+        collection = self.get_collection(pdf_name, create=False)
+        if collection is None:
+            return {}
+        stored = collection.get(
+            where={"page_fingerprint": {"$ne": ""}},
+            include=["documents", "embeddings", "metadatas"]
+        )
+        pages: Dict[Tuple[int, str], List[Tuple[int, str, List[float]]]] = {}
+        expected: Dict[Tuple[int, str], int] = {}
+        for text, embedding, metadata in zip(stored["documents"], stored["embeddings"], stored["metadatas"]):
+            key = (metadata["page_number"], metadata["page_fingerprint"])
+            pages.setdefault(key, []).append((metadata.get("chunk_num", 0), text, list(embedding)))
+            expected[key] = metadata.get("page_chunks", 0)
+        # Only pages whose chunks are all stored can be reused
+        return {
+            key: [(text, embedding) for _, text, embedding in sorted(chunks, key=lambda chunk: chunk[0])]
+            for key, chunks in pages.items() if len(chunks) == expected[key]
+        }
+
+    def _vectorize_chunks(self, pdf_data: PDFSuccessResponse, chunks: Iterable[Any]) -> Dict[str, Any]:
+        """Store a stream of chunks and build the response"""
+        pdf_name = pdf_data.pdf_filename
+        total_pages = pdf_data.total_pages
+
+        result = self._process_and_store_chunks(
+            chunks=chunks,
+            pdf_name=pdf_name,
+            total_pages=total_pages
+        )
+
+        return {
+            "status": "success",
+            "pdf_name": pdf_name,
+            "total_pages": total_pages,
+            "chunks_created": result['chunks_created'],
+            "chunks_stored": result['chunks_stored'],
+            "chunks_skipped": result['chunks_skipped'],
+            "chunks_duplicate": result['chunks_duplicate'],
+            "chunks_deleted": result['chunks_deleted'],
+            "chunks_reused": result['chunks_reused'],
+            "persistence_mode": "persistent" if self.persist_db else "in-memory",
+            "timings": result['timings'],
+            "embedding_cache": self.embedding_cache_stats(),
+            "retrieval_cache": self.retrieval_cache.stats()
+        }
+
+    def new_chunk_texts(self, pdf_name: str, chunks: Iterable[str]) -> List[str]:
         """
-        Read all part files in the PDF directory and combine them.
+        Distinct chunk texts not stored yet for the document, the ones its ingestion has to embed
 
         Args:
-            pdf_dir: Path to PDF directory containing part files
+            pdf_name: Name of the PDF
+            chunks: Chunk texts of the document
 
         Returns:
-            Combined text content from all parts
+            Chunk texts, in document order
         """
-        try:
-            # Get all part files
-            part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
-            part_files.sort()  # Ensure proper order
+        existing_ids = set(self.get_collection(pdf_name).get(include=[])["ids"])
+        new_texts, seen_ids = [], set()
+        for chunk_text in chunks:
+            chunk_id = self.chunk_id(pdf_name, chunk_text)
+            if chunk_id not in existing_ids and chunk_id not in seen_ids:
+                seen_ids.add(chunk_id)
+                new_texts.append(chunk_text)
+        return new_texts
+
+    def store_chunks(self, pdf_data: PDFSuccessResponse, chunks: List[str],
+                     embeddings: Dict[str, List[float]]) -> Dict[str, Any]:
+        """
+        Store the chunks of a document with embeddings computed by the caller
+
+        Lets a batch ingestion embed chunks of several documents in the same
+        forward passes; chunks without an embedding are embedded here.
+
+        Args:
+            pdf_data: Extracted PDF details
+            chunks: Chunk texts, in document order
+            embeddings: Embeddings by chunk text
+
+        Returns:
+            Dict with processing results
+        """
+        result = self._vectorize_chunks(pdf_data, ((text, {}, embeddings.get(text)) for text in chunks))
+        # Precomputed here, not reused from an earlier issue
+        result.pop("chunks_reused")
+        return result
 
-            if not part_files:
-                raise ValueError(f"No part files found in directory: {pdf_dir}")
+    def _iter_pdf_parts(self, pdf_dir: str) -> Iterator[str]:
+        """
+        Read the part files in the PDF directory one at a time, in part order.
 
-            pdf_content = ""
+        Args:
+            pdf_dir: Path to PDF directory containing part files
 
-            # Read each part file
-            for part_file in part_files:
-                part_path = os.path.join(pdf_dir, part_file)
+        Yields:
+            Cleaned text content of each part
+        """
+        # Get all part files, ordered by part number (part_2 before part_10)
+        part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
+        part_files.sort(key=lambda f: int(re.sub(r"\D", "", f) or 0))
 
-                with open(part_path, 'r', encoding='utf-8') as f:
-                    part_content = f.read()
+        if not part_files:
+            raise ValueError(f"No part files found in directory: {pdf_dir}")
 
-                # Clean and add to combined content
-                cleaned_content = self.clean_text(part_content)
-                pdf_content += f"{cleaned_content}\n\n"
+        for part_file in part_files:
+            part_path = os.path.join(pdf_dir, part_file)
 
-            return pdf_content.strip()
+            with open(part_path, 'r', encoding='utf-8') as f:
+                part_content = f.read()
 
-        except Exception as e:
-            raise e
+            cleaned_content = self.clean_text(part_content)
+            if cleaned_content:
+                yield cleaned_content
 
-    def _process_and_store_chunks(self, pdf_content: str, pdf_name: str, total_pages: int) -> Dict[str, int]:
+    @staticmethod
+    def chunk_id(pdf_name: str, chunk_text: str) -> str:
+        """Stable chunk id from hashes of the document name and the chunk content"""
+        document_digest = hashlib.sha1(pdf_name.encode("utf-8")).hexdigest()[:8]
+        content_digest = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()[:24]
+        return f"{document_digest}-{content_digest}"
+
+    def _process_and_store_chunks(self, chunks: Iterable[str | Tuple[str, Dict[str, Any], Optional[List[float]]]],
+                                  pdf_name: str, total_pages: int) -> Dict[str, Any]:
         """
-        Process PDF content into chunks and store in ChromaDB.
+        Embed a stream of chunks and store them in ChromaDB.
+
+        Chunk ids are content hashes, so ingestion is idempotent: chunks already
+        stored for the document are skipped without being embedded, repeated
+        chunks are stored once, new chunks are upserted, and chunks of a previous
+        version of the document that no longer occur are deleted.
+
+        Chunks are consumed in batches of VECTOR_WRITE_BATCH_SIZE: each batch of
+        new chunks is embedded (EMBEDDING_BATCH_SIZE texts per forward pass) and
+        written with a single upsert call, so only one batch of chunks is held in
+        memory at a time. Chunks may carry extra metadata and a precomputed
+        embedding, which is stored as is instead of being computed again.
 
         Args:
-            pdf_content: Combined text content from all PDF parts
+            chunks: Chunk texts, or (text, extra metadata, embedding or None), in document order
             pdf_name: Name of the PDF
             total_pages: Total number of pages in PDF
 
         Returns:
-            Dictionary with processing statistics
+            Dictionary with processing statistics and per-stage timings
         """
         try:
-            # Create chunks from the content
-            chunks = self.tokenize_sentences(pdf_content)
+            collection = self.get_collection(pdf_name)
+            self._ensure_keyword_index(pdf_name)
+            timings = {"chunking_seconds": 0.0, "embedding_seconds": 0.0, "storage_seconds": 0.0}
+            created_at = datetime.now(timezone.utc).timestamp()
+            chunks_created, chunks_stored, chunks_skipped, chunks_duplicate, chunks_reused = 0, 0, 0, 0, 0
+
+            storage_started = time.perf_counter()
+            existing_ids = set(collection.get(include=[])["ids"])
+            timings["storage_seconds"] += time.perf_counter() - storage_started
+            seen_ids, seen_metadatas = [], []
+            seen_set = set()
+            batch_texts, batch_metadatas, batch_ids, batch_embeddings = [], [], [], []
+
+            def store_batch():
+                nonlocal chunks_stored
+                # Generate the missing embeddings of the batch in batched forward passes
+                embedding_started = time.perf_counter()
+                missing = [index for index, embedding in enumerate(batch_embeddings) if embedding is None]
+                if missing:
+                    computed = self.get_text_embeddings([batch_texts[index] for index in missing])
+                    for index, embedding in zip(missing, computed):
+                        batch_embeddings[index] = embedding
+                timings["embedding_seconds"] += time.perf_counter() - embedding_started
+
+                storage_started = time.perf_counter()
+                collection.upsert(
+                    documents=batch_texts,
+                    embeddings=batch_embeddings,
+                    metadatas=batch_metadatas,
+                    ids=batch_ids
+                )
+                chunks_stored += len(batch_ids)
+                self.keyword_index.add_chunks(pdf_name, batch_ids, batch_texts)
+                timings["storage_seconds"] += time.perf_counter() - storage_started
+
+            chunk_iterator = iter(chunks)
+            while True:
+                chunking_started = time.perf_counter()
+                chunk = next(chunk_iterator, None)
+                timings["chunking_seconds"] += time.perf_counter() - chunking_started
+                if chunk is None:
+                    break
+                chunk_text, extra_metadata, embedding = (chunk, {}, None) if isinstance(chunk, str) else chunk
+
+                chunks_created += 1
+                chunk_id = self.chunk_id(pdf_name, chunk_text)
+                if chunk_id in seen_set:
+                    # Same text earlier in the document (e.g. repeated footnotes)
+                    chunks_duplicate += 1
+                    continue
+                seen_set.add(chunk_id)
+                seen_ids.append(chunk_id)
+                seen_metadatas.append(extra_metadata)
+                if chunk_id in existing_ids:
+                    chunks_skipped += 1
+                    continue
 
-            if not chunks:
+                chunk_num = len(seen_ids)
+                # Creating metadata
+                batch_metadatas.append({
+                    "pdf_name": pdf_name,
+                    "pdf_len": total_pages,
+                    "chunk_num": chunk_num,
+                    "chunk_id": f"{pdf_name}_chunk_{chunk_num:03d}",
+                    "created_at": created_at,
+                    "content_length": len(chunk_text),
+                    "source": "pdf_vectorization",
+                    **extra_metadata
+                })
+                batch_texts.append(chunk_text)
+                batch_ids.append(chunk_id)
+                batch_embeddings.append(embedding)
+                chunks_reused += embedding is not None
+
+                if len(batch_ids) >= VECTOR_WRITE_BATCH_SIZE:
+                    store_batch()
+                    batch_texts, batch_metadatas, batch_ids, batch_embeddings = [], [], [], []
+
+            if batch_ids:
+                store_batch()
+
+            if not chunks_created:
                 raise ValueError("No chunks were created from the PDF content")
 
-            chunks_stored = 0
-
-            # Process each chunk
-            for chunk_num, chunk_text in enumerate(chunks, 1):
-                try:
-                    # Generate embedding for the chunk
-                    embedding = self.get_text_embedding(chunk_text)
-
-                    # Creating metadata
-                    metadata = {
-                        "pdf_name": pdf_name,
-                        "pdf_len": total_pages,
-                        "chunk_num": chunk_num,
-                        "total_chunks": len(chunks),
-                        "chunk_id": f"{pdf_name}_chunk_{chunk_num:03d}",
-                        "created_at": datetime.now(timezone.utc).timestamp(),
-                        "content_length": len(chunk_text),
-                        "source": "pdf_vectorization"
-                    }
-
-                    # Generate unique ID for this chunk
-                    chunk_id = f"{pdf_name}_{chunk_num:03d}_{str(uuid.uuid4())[:8]}"
-
-                    # Store in ChromaDB
-                    self.collection.add(
-                        documents=[chunk_text],
-                        embeddings=[embedding],
-                        metadatas=[metadata],
-                        ids=[chunk_id]
-                    )
+            storage_started = time.perf_counter()
+            # Chunks of the previous version of the document that are gone from this one
+            stale_ids = list(existing_ids - seen_set)
+            for start in range(0, len(stale_ids), VECTOR_WRITE_BATCH_SIZE):
+                collection.delete(ids=stale_ids[start:start + VECTOR_WRITE_BATCH_SIZE])
+            self.keyword_index.remove_chunks(pdf_name, stale_ids)
+
+            # Positions and the chunk count are only known once the stream is exhausted
+            for start in range(0, len(seen_ids), VECTOR_WRITE_BATCH_SIZE):
+                batch = seen_ids[start:start + VECTOR_WRITE_BATCH_SIZE]
+                collection.update(
+                    ids=batch,
+                    metadatas=[
+                        {
+                            "chunk_num": chunk_num,
+                            "chunk_id": f"{pdf_name}_chunk_{chunk_num:03d}",
+                            "pdf_len": total_pages,
+                            "total_chunks": len(seen_ids),
+                            **extra_metadata
+                        }
+                        for chunk_num, extra_metadata in enumerate(seen_metadatas[start:start + len(batch)], start + 1)
+                    ]
+                )
+            timings["storage_seconds"] += time.perf_counter() - storage_started
 
-                    chunks_stored += 1
+            metrics.chunking_seconds.observe(timings["chunking_seconds"])
+            metrics.vector_write_seconds.observe(timings["storage_seconds"])
 
-                except Exception as e:
-                    continue
+            if chunks_stored or stale_ids:
+                # Cached search results no longer reflect the document's chunks
+                self.retrieval_cache.invalidate(pdf_name)
 
             return {
-                "chunks_created": len(chunks),
-                "chunks_stored": chunks_stored
+                "chunks_created": chunks_created,
+                "chunks_stored": chunks_stored,
+                "chunks_skipped": chunks_skipped,
+                "chunks_duplicate": chunks_duplicate,
+                "chunks_deleted": len(stale_ids),
+                "chunks_reused": chunks_reused,
+                "timings": {stage: round(seconds, 4) for stage, seconds in timings.items()}
             }
 
         except Exception as e:
             raise e
 
-    def semantic_search(self, query: str, pdf_name: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+    def semantic_search(self, query: str, pdf_name: Optional[str] = None, top_k: int = 5,
+                        mode: str = SEARCH_MODE) -> Dict[str, Any]:
         """
         Search for similar chunks in the vector database.
 
+        With a pdf_name only that document's collection is searched, so latency
+        does not grow with the number of ingested documents.
+
         Args:
             query: Search query text
-            pdf_name: Optional PDF name to filter results
+            pdf_name: Optional PDF name to scope the search to
             top_k: Number of results to return
+            mode: "vector", "lexical" (BM25), "hybrid" (both, fused) or "auto"
+                  (lexical for short keyword lookups, hybrid otherwise); the
+                  lexical index is per document, so unscoped searches use "vector"
 
         Returns:
             Dictionary with search results
         """
+        started = time.perf_counter()
         try:
+            if not pdf_name:
+                mode = "vector"
+            elif mode != "vector":
+                self._ensure_keyword_index(pdf_name)
+            if mode == "auto":
+                if self.keyword_index.is_keyword_lookup(pdf_name, query, KEYWORD_LOOKUP_MAX_TERMS):
+                    mode = "lexical"
+                else:
+                    mode = "hybrid"
+
+            # Keyword lookups skip the embedding forward pass and the ANN query entirely
+            if mode == "lexical":
+                results = self._lexical_search(pdf_name, query, top_k)
+                metrics.search_seconds.labels(mode).observe(time.perf_counter() - started)
+                return {
+                    "success": True,
+                    "query": query,
+                    "mode": mode,
+                    "results": results,
+                    "count": len(results['documents'][0])
+                }
+
             # Generate embedding for the query
             query_embedding = self.get_text_embedding(query)
 
-            where_clause = None
-            if pdf_name:
-                where_clause = {"pdf_name": pdf_name}
+            # Reuse the results of a near-identical earlier query
+            cached_results = self.retrieval_cache.get(pdf_name, top_k, query_embedding, mode)
+            metrics.cache_lookup("retrieval", cached_results is not None, cached_results is None)
+            if cached_results is not None:
+                metrics.search_seconds.labels(mode).observe(time.perf_counter() - started)
+                return {
+                    "success": True,
+                    "query": query,
+                    "mode": mode,
+                    "results": cached_results,
+                    "count": len(cached_results['documents'][0]) if cached_results['documents'] else 0,
+                    "cached": True
+                }
 
             # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=where_clause,
-                include=["documents", "metadatas", "distances"]
-            )
+            if pdf_name:
+                candidates = top_k * HYBRID_CANDIDATES if mode == "hybrid" else top_k
+                results = self._search_document(pdf_name, query_embedding, candidates)
+            else:
+                results = self._search_all_documents(query_embedding, top_k)
+            if mode == "hybrid":
+                results = self._fuse_results(pdf_name, query, results, top_k)
+            self.retrieval_cache.set(pdf_name, top_k, query, query_embedding, results, mode)
+            metrics.search_seconds.labels(mode).observe(time.perf_counter() - started)
 
             return {
                 "success": True,
                 "query": query,
+                "mode": mode,
                 "results": results,
                 "count": len(results['documents'][0]) if results['documents'] else 0
             }
@@ -325,4 +743,101 @@ class VectorService:
                 "query": query
             }
 
+    def _document_chunks_source(self, pdf_name: str):
+        """Collection holding a document's chunks and the where clause selecting them"""
+        collection = self.get_collection(pdf_name, create=False)
+        if collection is None:
+            # Documents ingested before per-document collections live in the shared collection
+            return self.collection, {"pdf_name": pdf_name}
+        return collection, None
+
+    def _ensure_keyword_index(self, pdf_name: str):
+        """Build the keyword index of a document from its stored chunks, once per process"""
+        if self.keyword_index.has_document(pdf_name):
+            return
+        collection, where_clause = self._document_chunks_source(pdf_name)
+        stored = collection.get(where=where_clause, include=["documents"])
+        self.keyword_index.add_chunks(pdf_name, stored['ids'], stored['documents'])
+
+    def _get_chunks(self, pdf_name: str, chunk_ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Documents and metadata of chunks by id"""
+        if not chunk_ids:
+            return {}
+        collection, _ = self._document_chunks_source(pdf_name)
+        stored = collection.get(ids=chunk_ids, include=["documents", "metadatas"])
+        return {
+            chunk_id: (document, metadata)
+            for chunk_id, document, metadata in zip(stored['ids'], stored['documents'], stored['metadatas'])
+        }
+
+    def _lexical_search(self, pdf_name: str, query: str, top_k: int) -> Dict[str, Any]:
+        """BM25 search over the keyword index of a document"""
+        ranked = self.keyword_index.search(pdf_name, query, top_k)
+        chunks = self._get_chunks(pdf_name, [chunk_id for chunk_id, _ in ranked])
+        ranked = [(chunk_id, score) for chunk_id, score in ranked if chunk_id in chunks]
+        return {
+            "ids": [[chunk_id for chunk_id, _ in ranked]],
+            "documents": [[chunks[chunk_id][0] for chunk_id, _ in ranked]],
+            "metadatas": [[chunks[chunk_id][1] for chunk_id, _ in ranked]],
+            "scores": [[score for _, score in ranked]]
+        }
+
+    def _fuse_results(self, pdf_name: str, query: str, vector_results: Dict[str, Any], top_k: int) -> Dict[str, Any]:
+        """Combine vector and BM25 rankings with reciprocal rank fusion"""
+        lexical_ranked = self.keyword_index.search(pdf_name, query, top_k * HYBRID_CANDIDATES)
+
+        scores: Dict[str, float] = {}
+        for rank, chunk_id in enumerate(vector_results['ids'][0]):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (RRF_K + rank + 1)
+        for rank, (chunk_id, _) in enumerate(lexical_ranked):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1 / (RRF_K + rank + 1)
+        fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+        chunks = {
+            chunk_id: (document, metadata)
+            for chunk_id, document, metadata in zip(
+                vector_results['ids'][0], vector_results['documents'][0], vector_results['metadatas'][0]
+            )
+        }
+        chunks.update(self._get_chunks(pdf_name, [chunk_id for chunk_id, _ in fused if chunk_id not in chunks]))
+        fused = [(chunk_id, score) for chunk_id, score in fused if chunk_id in chunks]
+        return {
+            "ids": [[chunk_id for chunk_id, _ in fused]],
+            "documents": [[chunks[chunk_id][0] for chunk_id, _ in fused]],
+            "metadatas": [[chunks[chunk_id][1] for chunk_id, _ in fused]],
+            "scores": [[score for _, score in fused]]
+        }
+
+    def _search_document(self, pdf_name: str, query_embedding: List[float], top_k: int) -> Dict[str, Any]:
+        """Query the collection of one document"""
+        collection, where_clause = self._document_chunks_source(pdf_name)
+        with metrics.vector_query_seconds.labels("document").time():
+            return collection.query(
+                query_embeddings=[query_embedding],
+                n_results=top_k,
+                where=where_clause,
+                include=["documents", "metadatas", "distances"]
+            )
 
+    def _search_all_documents(self, query_embedding: List[float], top_k: int) -> Dict[str, Any]:
+        """Query every collection and keep the overall closest top_k chunks"""
+        matches = []
+        for collection in [self.collection, *self._document_collections()]:
+            if not collection.count():
+                continue
+            with metrics.vector_query_seconds.labels("all_documents").time():
+                results = collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=top_k,
+                    include=["documents", "metadatas", "distances"]
+                )
+            matches.extend(zip(results['ids'][0], results['documents'][0],
+                               results['metadatas'][0], results['distances'][0]))
+        matches.sort(key=lambda match: match[3])
+        matches = matches[:top_k]
+        return {
+            "ids": [[match[0] for match in matches]],
+            "documents": [[match[1] for match in matches]],
+            "metadatas": [[match[2] for match in matches]],
+            "distances": [[match[3] for match in matches]]
+        }
@@ -0,0 +1,167 @@
+"""
+Throughput of the chunking engine against the previous implementation.
+
+Extracts the pages of a PDF once, then times text normalization and chunking
+with both implementations and reports pages/s, MB/s, chunk counts, how much of
+the text ended up in a chunk and how many chunks exceed the embedding model's
+token limit.
+
+    python benchmarks/chunking_benchmark.py [--pdf test_wasde_pdf/usgov_wasde.pdf] [--repeat 5]
+
+The embedding model's tokenizer is used when EMBEDDING_MODEL (or --model) can be
+loaded; otherwise tokens are approximated by words and punctuation marks.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.chunking_service import ChunkingService, normalize_text  # noqa: E402
+
+
+def legacy_clean_text(text: str) -> str:
+    """The four-pass clean_text of the previous VectorService"""
+    text = text.replace("\u200b", "")
+    text = re.sub(r"\n+", " ", text)
+    text = re.sub(r"\t+", " ", text)
+    text = re.sub(r"\s{2,}", " ", text).strip()
+    return text
+
+
+def legacy_iter_chunks(texts: Iterable[str], sent_tokenize: Callable[[str], List[str]],
+                       min_tokens: int = 300, max_tokens: int = 500) -> Iterator[str]:
+    """The sentence chunker of the previous VectorService: word counts, chunks under min_tokens dropped"""
+    pending = ""
+    current_chunk, current_token_count = [], 0
+
+    def add_sentences(sentences):
+        nonlocal current_chunk, current_token_count
+        for sentence in sentences:
+            token_count = len(sentence.split())
+            if current_token_count + token_count > max_tokens:
+                if current_token_count >= min_tokens:
+                    yield " ".join(current_chunk)
+                current_chunk, current_token_count = [sentence], token_count
+            else:
+                current_chunk.append(sentence)
+                current_token_count += token_count
+
+    for text in texts:
+        pending = f"{pending} {text}" if pending else text
+        sentences = sent_tokenize(pending)
+        if not sentences:
+            pending = ""
+            continue
+        pending = sentences.pop()
+        yield from add_sentences(sentences)
+
+    if pending:
+        yield from add_sentences(sent_tokenize(pending))
+    if current_chunk:
+        yield " ".join(current_chunk)
+
+
+def load_sent_tokenize():
+    """nltk.sent_tokenize, or None when nltk or its punkt data is unavailable"""
+    try:
+        import nltk
+        from nltk.tokenize import sent_tokenize
+        try:
+            sent_tokenize("Probe. Sentence.")
+        except LookupError:
+            nltk.download("punkt", quiet=True)
+            nltk.download("punkt_tab", quiet=True)
+            sent_tokenize("Probe. Sentence.")
+        return sent_tokenize
+    except Exception as e:
+        print(f"Legacy chunker skipped, nltk punkt unavailable: {e}", file=sys.stderr)
+        return None
+
+
+def load_chunking_service(model_name: str | None) -> ChunkingService:
+    """Chunker on the embedding model's tokenizer, or on word tokens if the model cannot be loaded"""
+    if model_name:
+        try:
+            from sentence_transformers import SentenceTransformer
+            return ChunkingService.for_model(SentenceTransformer(model_name))
+        except Exception as e:
+            print(f"Embedding model {model_name} unavailable, counting word tokens: {e}", file=sys.stderr)
+    return ChunkingService()
+
+
+def coverage(text: str, chunks: List[str]) -> float:
+    """Fraction of the text's characters that appear in a chunk, following chunk order"""
+    covered, position = 0, 0
+    for chunk in chunks:
+        index = text.find(chunk, max(0, position - len(chunk)))
+        if index < 0:
+            continue
+        covered += max(0, index + len(chunk) - max(position, index))
+        position = max(position, index + len(chunk))
+    return covered / len(text) if text else 1.0
+
+
+def run(name: str, pages: List[str], clean: Callable[[str], str], chunk: Callable[[Iterable[str]], Iterator[str]],
+        chunker: ChunkingService, repeat: int) -> Dict[str, object]:
+    """Best-of-repeat timing of normalization plus chunking, and the quality of the chunks"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = list(chunk(clean(page) for page in pages))
+        timings.append(time.perf_counter() - start)
+
+    text = " ".join(filter(None, (clean(page) for page in pages)))
+    token_counts = [chunker.count_tokens(c) for c in chunks]
+    seconds = min(timings)
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / 1e6
+    return {
+        "implementation": name,
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(len(pages) / seconds, 1),
+        "mb_per_second": round(megabytes / seconds, 2),
+        "chunks": len(chunks),
+        "text_coverage": round(coverage(text, chunks), 4),
+        "max_chunk_tokens": max(token_counts, default=0),
+        "chunks_over_model_limit": sum(count > chunker.max_tokens for count in token_counts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pdf", default="test_wasde_pdf/usgov_wasde.pdf")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL"))
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    with fitz.open(args.pdf) as doc:
+        pages = [f"--- PAGE {page_num + 1} ---\n{doc[page_num].get_text()}" for page_num in range(len(doc))]
+
+    chunker = load_chunking_service(args.model)
+    results = [run("chunking_service", pages, normalize_text, chunker.iter_chunks, chunker, args.repeat)]
+    sent_tokenize = load_sent_tokenize()
+    if sent_tokenize is not None:
+        results.insert(0, run("legacy", pages, legacy_clean_text,
+                              lambda texts: legacy_iter_chunks(texts, sent_tokenize), chunker, args.repeat))
+
+    if args.json:
+        print(json.dumps({"pdf": args.pdf, "pages": len(pages), "model_max_tokens": chunker.max_tokens,
+                          "results": results}, indent=2))
+        return
+
+    print(f"{args.pdf}: {len(pages)} pages, model limit {chunker.max_tokens} tokens, best of {args.repeat}")
+    columns = list(results[0])
+    print("  ".join(f"{column:>23}" for column in columns))
+    for result in results:
+        print("  ".join(f"{str(result[column]):>23}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
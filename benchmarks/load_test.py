@@ -0,0 +1,254 @@
+"""
+Concurrent load test of /chat, /chat/stream and /upload-pdf.
+
+Virtual users send a weighted mix of chat questions and PDF uploads for a
+fixed duration or request count and the run reports, per endpoint,
+throughput, p50/p95/p99 latency and the error rate. By default the app runs
+in-process over an ASGI transport, with the local LLM backend and, unless
+EMBEDDING_MODEL can be loaded, the hashing embedding stub, so no deployed
+service or network is needed. --url targets a running server instead.
+
+    python benchmarks/load_test.py [--concurrency 8 16 32] [--duration 30] [--mix chat=8,chat_stream=1,upload=1]
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 4 --requests 200
+
+LOCAL_LLM_LATENCY_MS and LOCAL_LLM_TOKENS_PER_SECOND (or --llm-latency and
+--llm-tokens-per-second) make the local backend behave like a provider.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.pipeline_benchmark import QUERIES, percentile  # noqa: E402
+from benchmarks.stubs import StubEmbeddingModel  # noqa: E402
+
+ENDPOINTS = ("chat", "chat_stream", "upload")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """"chat=8,upload=1" -> endpoint weights"""
+    weights = {}
+    for part in mix.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint.strip() not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint in mix: {endpoint} (expected {', '.join(ENDPOINTS)})")
+        weights[endpoint.strip()] = float(weight or 1)
+    return weights
+
+
+def load_questions(path: str | None) -> List[str]:
+    """One question per line of the file, or the benchmark questions"""
+    if not path:
+        return QUERIES
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, document: Tuple[str, bytes], question: str,
+               upload_operation: str) -> bool:
+    """One request; True when the endpoint reports success"""
+    pdf_name = os.path.splitext(document[0])[0]
+    if endpoint == "upload":
+        response = await client.post("/upload-pdf", files={"file": (document[0], document[1], "application/pdf")},
+                                     data={"operation": upload_operation})
+        body = response.json() if response.status_code == 200 else {}
+        # Chat uploads report a status, summarize uploads a success flag
+        return body.get("status", "success") == "success" and body.get("success", True) is True
+    if endpoint == "chat_stream":
+        completed = False
+        async with client.stream("POST", "/chat/stream", json={"file_name": pdf_name, "query": question}) as response:
+            async for line in response.aiter_lines():
+                completed = completed or line == "event: done"
+        return response.status_code == 200 and completed
+    response = await client.post("/chat", json={"file_name": pdf_name, "query": question})
+    body = response.json() if response.status_code == 200 else None
+    # Chat failures come back as a 200 with an error string
+    return isinstance(body, dict) and body.get("status") == "success"
+
+
+async def run_level(client: httpx.AsyncClient, concurrency: int, args, documents: List[Tuple[str, bytes]],
+                    questions: List[str], mix: Dict[str, float]) -> Dict[str, Any]:
+    """Drive the app with concurrency virtual users and collect per-endpoint latencies"""
+    rng = random.Random(args.seed)
+    endpoints, weights = list(mix), list(mix.values())
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    deadline = time.perf_counter() + args.duration
+    remaining = args.requests
+
+    async def user():
+        nonlocal remaining
+        while True:
+            if args.requests:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            elif time.perf_counter() >= deadline:
+                return
+            endpoint = rng.choices(endpoints, weights)[0]
+            started = time.perf_counter()
+            try:
+                succeeded = await send(client, endpoint, rng.choice(documents), rng.choice(questions),
+                                       args.upload_operation)
+            except Exception:
+                succeeded = False
+            latencies[endpoint].append(time.perf_counter() - started)
+            errors[endpoint] += not succeeded
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    endpoints_report = {}
+    for endpoint, samples in sorted(latencies.items()):
+        endpoints_report[endpoint] = {
+            "requests": len(samples),
+            "errors": errors[endpoint],
+            "error_rate": round(errors[endpoint] / len(samples), 4),
+            "throughput_per_second": round(len(samples) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(samples, 0.50) * 1000, 2),
+                "p95": round(percentile(samples, 0.95) * 1000, 2),
+                "p99": round(percentile(samples, 0.99) * 1000, 2),
+                "mean": round(sum(samples) / len(samples) * 1000, 2)
+            }
+        }
+    total = sum(len(samples) for samples in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests": total,
+        "throughput_per_second": round(total / elapsed, 2) if elapsed else None,
+        "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+        "endpoints": endpoints_report
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    documents = []
+    for path in args.pdf:
+        with open(path, 'rb') as f:
+            documents.append((os.path.basename(path), f.read()))
+    questions = load_questions(args.questions)
+    mix = parse_mix(args.mix)
+
+    registry, embedding_backend = None, None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        registry, embedding_backend = start_in_process(args)
+        from main import app
+        await registry.wait_until_ready()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+
+    try:
+        # Every document is ingested once before the timed runs, so chat has something to retrieve
+        for document in documents:
+            if not await send(client, "upload", document, "", "chat"):
+                raise RuntimeError(f"Could not ingest {document[0]} before the load test")
+        levels = []
+        for concurrency in args.concurrency:
+            level = await run_level(client, concurrency, args, documents, questions, mix)
+            levels.append(level)
+            print_level(level)
+    finally:
+        await client.aclose()
+        if registry is not None:
+            await registry.shutdown()
+
+    return {
+        "meta": {
+            "target": args.url or "in-process",
+            "documents": [name for name, _ in documents],
+            "mix": mix,
+            "duration_seconds": None if args.requests else args.duration,
+            "requests_per_level": args.requests or None,
+            "embedding_model": embedding_backend,
+            "llm_backend": None if args.url else f"local (latency {os.environ['LOCAL_LLM_LATENCY_MS']} ms, "
+                                                 f"{os.environ['LOCAL_LLM_TOKENS_PER_SECOND']} tokens/s)",
+            "cpu_count": os.cpu_count()
+        },
+        "levels": levels
+    }
+
+
+def start_in_process(args):
+    """Configure the local backends, start the app's services and return the registry"""
+    os.environ["LLM_BACKEND"] = "local"
+    os.environ["LOCAL_LLM_LATENCY_MS"] = str(args.llm_latency)
+    os.environ["LOCAL_LLM_TOKENS_PER_SECOND"] = str(args.llm_tokens_per_second)
+    os.environ["VECTOR_PERSIST"] = "false"
+    # Services write under app/utils relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="summarizer-load-"))
+
+    from app.services import vector_service as vector_module
+    from app.services.service_registry import registry
+
+    embedding_backend = vector_module.EMBEDDING_MODEL if not args.stub_embeddings else None
+    if embedding_backend:
+        try:
+            vector_module.get_embedding_model()
+        except Exception as e:
+            print(f"Embedding model {embedding_backend} unavailable, using the stub: {e}", file=sys.stderr)
+            embedding_backend = None
+    if not embedding_backend:
+        vector_module.CURRENT_EMBEDDING_MODEL = StubEmbeddingModel()
+        embedding_backend = "stub"
+    registry.startup()
+    return registry, embedding_backend
+
+
+def print_level(level: Dict[str, Any]):
+    print(f"concurrency {level['concurrency']}: {level['requests']} requests in {level['elapsed_seconds']}s, "
+          f"{level['throughput_per_second']} req/s, error rate {level['error_rate']:.2%}")
+    print(f"  {'endpoint':<12} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, report in level["endpoints"].items():
+        latency = report["latency_ms"]
+        print(f"  {endpoint:<12} {report['requests']:>9} {report['throughput_per_second']:>8} "
+              f"{report['error_rate']:>7.2%} {latency['p50']:>9} {latency['p95']:>9} {latency['p99']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server; the app runs in-process when omitted")
+    parser.add_argument("--pdf", nargs="+", default=[os.path.join(ROOT, "test_wasde_pdf", "usgov_wasde.pdf")])
+    parser.add_argument("--questions", help="File with one chat question per line")
+    parser.add_argument("--mix", default="chat=8,chat_stream=1,upload=1", help="Endpoint weights")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Virtual users, per level")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per concurrency level")
+    parser.add_argument("--requests", type=int, default=0, help="Requests per level instead of a duration")
+    parser.add_argument("--upload-operation", choices=["chat", "summarize"], default="chat")
+    parser.add_argument("--llm-latency", type=float, default=float(os.getenv("LOCAL_LLM_LATENCY_MS", "0")),
+                        help="Time to the first token of the local LLM backend, in ms")
+    parser.add_argument("--llm-tokens-per-second", type=float,
+                        default=float(os.getenv("LOCAL_LLM_TOKENS_PER_SECOND", "0")))
+    parser.add_argument("--stub-embeddings", action="store_true", help="Use the hashing stub even if the model loads")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Request timeout, in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+    args.pdf = [os.path.abspath(path) for path in args.pdf]
+    args.questions = os.path.abspath(args.questions) if args.questions else None
+    output = os.path.abspath(args.output) if args.output else None
+
+    report = asyncio.run(run(args))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Stage-level benchmarks of the ingest, retrieval and summarization pipeline.
+
+Runs each stage on the test report and on synthetic larger reports built from
+it, and reports throughput, latency percentiles and peak traced memory per
+stage. Everything runs offline: the LLM is the local backend of
+app/services/llm_backends.py, the vector store is in-memory, the caches are
+disabled and, unless --model can be loaded, the embedding model is a
+token-hashing stub.
+
+    python benchmarks/pipeline_benchmark.py run [--scales 1 4] [--repeat 3] [--output before.json]
+    python benchmarks/pipeline_benchmark.py compare before.json after.json [--threshold 0.1]
+
+Stages: extract (PDFService.process_pdf), clean_text, tokenize_sentences,
+chunking, embed_query (get_text_embedding), embed_batch, store
+(_process_and_store_chunks with precomputed embeddings), search_vector and
+search_hybrid (semantic_search) and summarize (LLMService.iter_summarize).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence
+
+import fitz  # PyMuPDF
+from starlette.datastructures import UploadFile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stubs import StubEmbeddingModel  # noqa: E402
+
+QUERIES = [
+    "corn ending stocks",
+    "What is the outlook for U.S. wheat exports this marketing year?",
+    "soybean oil price",
+    "How did the projected season-average farm price for soybeans change?",
+    "world rice production",
+    "Why were cotton beginning stocks revised?",
+    "beef production forecast",
+    "sugar imports from Mexico",
+    "How is feed and residual use of corn expected to change?",
+    "global coarse grain trade",
+    "egg price forecast",
+    "What drives the change in Brazil soybean exports?",
+]
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of the samples"""
+    ordered = sorted(samples)
+    # Rounded first so float error (0.07 * 100 == 7.000000000000001) does not skip a rank
+    rank = math.ceil(round(fraction * len(ordered), 9))
+    return ordered[max(0, min(len(ordered) - 1, rank - 1))]
+
+
+def build_document(source_path: str, scale: int, path: str) -> int:
+    """
+    A report scale times the length of the source, with distinct text in every copy
+
+    The first copy keeps the source pages; copy k re-typesets each page's text
+    with every number shifted by k, so chunks and ids differ between copies.
+
+    Returns:
+        Page count of the document
+    """
+    with fitz.open(source_path) as source, fitz.open() as document:
+        document.insert_pdf(source)
+        for copy in range(1, scale):
+            for page in source:
+                text = re.sub(r"\d+", lambda match: str(int(match.group()) + copy), page.get_text())
+                lines = text.split("\n")
+                new_page = document.new_page(width=1200, height=len(lines) * 10 + 72)
+                new_page.insert_text((36, 46), lines, fontsize=8, lineheight=1.25)
+        document.save(path)
+        return len(document)
+
+
+def measure(stage: str, unit: str, items_per_call: Sequence[int], call: Callable[[Any], Any],
+            arguments: Sequence[Any], repeat: int) -> Dict[str, Any]:
+    """
+    Time call over every argument, repeat times, then trace the peak memory of one pass
+
+    Args:
+        stage: Stage name
+        unit: What the throughput counts
+        items_per_call: Units processed by the call on each argument
+        call: The stage under test
+        arguments: One argument per call
+        repeat: Timed passes over the arguments
+
+    Returns:
+        Throughput, latency percentiles and peak memory of the stage
+    """
+    samples = []
+    for _ in range(repeat):
+        for argument in arguments:
+            started = time.perf_counter()
+            call(argument)
+            samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    for argument in arguments:
+        call(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    items = sum(items_per_call) * repeat
+    return {
+        "stage": stage,
+        "unit": unit,
+        "calls": len(samples),
+        "items": items,
+        "throughput_per_second": round(items / sum(samples), 2) if sum(samples) else None,
+        "latency_ms": {
+            "p50": round(percentile(samples, 0.50) * 1000, 3),
+            "p95": round(percentile(samples, 0.95) * 1000, 3),
+            "p99": round(percentile(samples, 0.99) * 1000, 3),
+            "mean": round(sum(samples) / len(samples) * 1000, 3)
+        },
+        "peak_memory_mb": round(peak / 1e6, 2)
+    }
+
+
+def load_embedding_model(model_name: str | None, stub: bool):
+    """The SentenceTransformer model, or the hashing stub when asked for or when it cannot be loaded"""
+    if model_name and not stub:
+        try:
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name), model_name
+        except Exception as e:
+            print(f"Embedding model {model_name} unavailable, using the stub: {e}", file=sys.stderr)
+    return StubEmbeddingModel(), "stub"
+
+
+def bench_document(pdf_path: str, name: str, services: Dict[str, Any], args) -> List[Dict[str, Any]]:
+    """Every stage on one document"""
+    pdf_service, vector_service, llm_service = services["pdf"], services["vector"], services["llm"]
+    repeat = args.repeat
+
+    def extract(_):
+        with open(pdf_path, 'rb') as f:
+            result = pdf_service.process_pdf(UploadFile(f, filename=f"{name}.pdf"))
+        if result.status != "success":
+            raise RuntimeError(result.error)
+        return result
+
+    total_pages = extract(None).total_pages
+    with fitz.open(pdf_path) as doc:
+        pages = [pdf_service.format_page(page_num + 1, doc[page_num].get_text()) for page_num in range(len(doc))]
+    cleaned = [vector_service.clean_text(page) for page in pages]
+    chunks = list(vector_service.iter_chunks(cleaned))
+    embeddings = vector_service.get_text_embeddings(chunks)
+    store_names = (f"{name}_store_{number}" for number in itertools.count())
+    vector_service._process_and_store_chunks(zip(chunks, itertools.repeat({}), embeddings), name, total_pages)
+    queries = list(itertools.islice(itertools.cycle(QUERIES), args.queries))
+
+    def search(mode: str):
+        def run(query: str):
+            vector_service.retrieval_cache.invalidate()
+            return vector_service.semantic_search(query, pdf_name=name, top_k=5, mode=mode)
+        return run
+
+    def summarize(_):
+        async def consume():
+            async for event in llm_service.iter_summarize(name, total_pages):
+                if event["event"] == "final":
+                    return event
+        # A fresh cache each time, so every part reaches the (stubbed) LLM
+        llm_service.summary_cache = services["summary_cache"]()
+        return asyncio.run(consume())
+
+    part_count = len([f for f in os.listdir(os.path.join(pdf_service.utils_dir, name)) if f.startswith("part_")])
+    entries = [
+        measure("extract", "pages", [total_pages], extract, [None], repeat),
+        measure("clean_text", "pages", [1] * len(pages), vector_service.clean_text, pages, repeat),
+        measure("tokenize_sentences", "pages", [1] * len(cleaned), vector_service.tokenize_sentences, cleaned, repeat),
+        measure("chunking", "chunks", [len(chunks)], lambda texts: list(vector_service.iter_chunks(texts)),
+                [cleaned], repeat),
+        measure("embed_query", "queries", [1] * len(queries), vector_service.get_text_embedding, queries, repeat),
+        measure("embed_batch", "chunks", [len(chunks)], vector_service.get_text_embeddings, [chunks], repeat),
+        measure("store", "chunks", [len(chunks)],
+                lambda _: vector_service._process_and_store_chunks(
+                    zip(chunks, itertools.repeat({}), embeddings), next(store_names), total_pages),
+                [None], repeat),
+        measure("search_vector", "queries", [1] * len(queries), search("vector"), queries, repeat),
+        measure("search_hybrid", "queries", [1] * len(queries), search("hybrid"), queries, repeat),
+        measure("summarize", "parts", [part_count], summarize, [None], repeat),
+    ]
+    for entry in entries:
+        entry.update(document=name, pages=total_pages, chunks=len(chunks))
+    return entries
+
+
+def run(args) -> Dict[str, Any]:
+    source_path = os.path.abspath(args.pdf)
+    # Services write under app/utils relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="summarizer-bench-"))
+
+    from app.services import vector_service as vector_module
+    from app.services.cache_service import SummaryCache
+    from app.services.llm_backends import LocalBackend
+    from app.services.llm_service import LLMService
+    from app.services.pdf_service import PDFService
+
+    vector_module.EMBEDDING_CACHE_ENABLED = False
+    vector_module.CURRENT_EMBEDDING_MODEL, embedding_backend = load_embedding_model(args.model, args.stub_embeddings)
+    vector_service = vector_module.VectorService()
+    services = {
+        "pdf": PDFService(),
+        "vector": vector_service,
+        "llm": LLMService(backend=LocalBackend(latency_ms=args.llm_latency, tokens_per_second=0),
+                          vector_service=vector_service),
+        "summary_cache": lambda: SummaryCache(cache_dir=tempfile.mkdtemp(prefix="summary-cache-"))
+    }
+
+    results = []
+    for scale in args.scales:
+        name = f"wasde_x{scale}"
+        pdf_path = os.path.abspath(f"{name}.pdf")
+        build_document(source_path, scale, pdf_path)
+        results.extend(bench_document(pdf_path, name, services, args))
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pdf": args.pdf,
+            "scales": args.scales,
+            "repeat": args.repeat,
+            "queries": args.queries,
+            "embedding_model": embedding_backend,
+            "llm_latency_ms": args.llm_latency
+        },
+        "results": results
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_results(report: Dict[str, Any]):
+    meta = report["meta"]
+    print(f"{meta['pdf']} scales {meta['scales']}, repeat {meta['repeat']}, embeddings: {meta['embedding_model']}, "
+          f"commit {meta['git_commit']}")
+    print(f"{'document':<12} {'stage':<19} {'throughput':>18} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'peak MB':>9}")
+    for entry in report["results"]:
+        throughput = f"{entry['throughput_per_second']} {entry['unit']}/s"
+        latency = entry["latency_ms"]
+        print(f"{entry['document']:<12} {entry['stage']:<19} {throughput:>18} {latency['p50']:>10} "
+              f"{latency['p95']:>10} {latency['p99']:>10} {entry['peak_memory_mb']:>9}")
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print the change of every stage between two runs
+
+    Returns:
+        The stages that regressed: throughput lower or p95 latency higher by more than threshold
+    """
+    base_entries = {(entry["document"], entry["stage"]): entry for entry in base["results"]}
+    regressions = []
+    print(f"base {base['meta']['git_commit']} ({base['meta']['created_at']}) -> "
+          f"new {new['meta']['git_commit']} ({new['meta']['created_at']})")
+    print(f"{'document':<12} {'stage':<19} {'throughput':>12} {'change':>8} {'p95 ms':>10} {'change':>8}")
+    for entry in new["results"]:
+        key = (entry["document"], entry["stage"])
+        if key not in base_entries:
+            continue
+        before = base_entries[key]
+        throughput_change = relative_change(before["throughput_per_second"], entry["throughput_per_second"])
+        p95_change = relative_change(before["latency_ms"]["p95"], entry["latency_ms"]["p95"])
+        regressed = throughput_change < -threshold or p95_change > threshold
+        if regressed:
+            regressions.append(f"{key[0]}/{key[1]}")
+        print(f"{key[0]:<12} {key[1]:<19} {entry['throughput_per_second']:>12} {throughput_change:>+8.1%} "
+              f"{entry['latency_ms']['p95']:>10} {p95_change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def relative_change(before: float | None, after: float | None) -> float:
+    return (after - before) / before if before and after is not None else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--pdf", default=os.path.join(ROOT, "test_wasde_pdf", "usgov_wasde.pdf"))
+    run_parser.add_argument("--scales", type=int, nargs="+", default=[1, 4],
+                            help="Document sizes, as multiples of the source report")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--queries", type=int, default=len(QUERIES))
+    run_parser.add_argument("--model", default=os.getenv("EMBEDDING_MODEL"))
+    run_parser.add_argument("--stub-embeddings", action="store_true", help="Use the hashing stub even if the model loads")
+    run_parser.add_argument("--llm-latency", type=float, default=0.0, help="Delay of each stubbed LLM call, in ms")
+    run_parser.add_argument("--output", help="Write the results to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Relative change flagged as a regression")
+    compare_parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on a regression")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.base, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        with open(args.new, 'r', encoding='utf-8') as f:
+            new = json.load(f)
+        regressions = compare(base, new, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+        return
+
+    output = os.path.abspath(args.output) if args.output else None
+    report = run(args)
+    print_results(report)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Offline stand-in for the embedding model, used by the benchmarks.
+
+StubEmbeddingModel hashes word tokens into a fixed-size vector, so texts get
+deterministic embeddings at a cost that grows with their length. The LLM
+needs no stub: LLM_BACKEND=local (app/services/llm_backends.py) runs offline.
+"""
+import re
+import zlib
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class StubEmbeddingModel:
+    """SentenceTransformer-compatible encode() over hashed word tokens"""
+
+    max_seq_length = 256
+    tokenizer = None
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def encode(self, texts, batch_size: int = 32, convert_to_tensor: bool = False, convert_to_numpy: bool = True,
+               show_progress_bar: bool = False):
+        single = isinstance(texts, str)
+        vectors = np.zeros((1 if single else len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            indices = [zlib.crc32(token.encode("utf-8")) % self.dimension
+                       for token in TOKEN_PATTERN.findall(text.lower())[:self.max_seq_length]]
+            np.add.at(vectors[row], indices, 1.0)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+        return vectors[0] if single else vectors
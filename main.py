@@ -1,21 +1,40 @@
+import time
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.routers.batch_router import batch_router
 from app.routers.chat_router import chat_router
+from app.routers.job_router import job_router
+from app.routers.metrics_router import metrics_router
 from app.routers.pdf_router import pdf_router
+from app.routers.table_router import table_router
 import os
 from dotenv import load_dotenv
 
 from app.routers.health_router import health_router
+from app.services.metrics_service import metrics
+from app.services.service_registry import registry
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bind immediately; the shared services are built by a background warmup task
+    registry.startup()
+    yield
+    await registry.shutdown()
+
+
 app = FastAPI(
     title="WASDE PDF Summarizer",
     description="Extract and summarize commodity information from USDA WASDE PDF reports",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -27,10 +46,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """In-flight gauge and latency (until the response starts) per route"""
+    route = metrics.route_of(app, request.scope)
+    in_flight = metrics.http_in_flight.labels(request.method, route)
+    in_flight.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_flight.dec()
+        metrics.http_seconds.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
 # Include routers
 app.include_router(health_router, tags=["Server checkup"])
 app.include_router(pdf_router, tags=["PDF Processing"])
 app.include_router(chat_router, tags=["LLM chat"])
+app.include_router(job_router, tags=["Background jobs"])
+app.include_router(table_router, tags=["Table lookups"])
+app.include_router(batch_router, tags=["Batch ingestion"])
+app.include_router(metrics_router, tags=["Server checkup"])
 
 @app.get("/")
 async def root():
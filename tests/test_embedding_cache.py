@@ -0,0 +1,62 @@
+import multiprocessing
+
+import numpy as np
+
+from app.services.cache_service import EmbeddingCache
+
+
+def vector(seed: int) -> np.ndarray:
+    return np.full(8, seed, dtype=np.float32)
+
+
+def test_instances_sharing_a_directory_return_their_own_vectors(tmp_path):
+    first = EmbeddingCache("model", cache_dir=str(tmp_path))
+    second = EmbeddingCache("model", cache_dir=str(tmp_path))
+
+    first.put_many(["x"], [vector(1)])
+    second.put_many(["y"], [vector(2)])
+
+    # A fresh instance reads every vector from disk, not from the LRU
+    for cache in (second, first, EmbeddingCache("model", cache_dir=str(tmp_path), lru_size=0)):
+        x, y = cache.get_many(["x", "y"])
+        assert np.array_equal(x, vector(1))
+        assert np.array_equal(y, vector(2))
+
+
+def write_texts(cache_dir: str, worker: int):
+    cache = EmbeddingCache("model", cache_dir=cache_dir)
+    for index in range(40):
+        # Every worker also writes the shared texts, so keys are written more than once
+        cache.put_many([f"{worker}-{index}", f"shared-{index}"], [vector(worker * 100 + index), vector(index)])
+
+
+def test_concurrent_processes_never_mix_up_rows(tmp_path):
+    workers = [multiprocessing.Process(target=write_texts, args=(str(tmp_path), worker)) for worker in range(1, 5)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    cache = EmbeddingCache("model", cache_dir=str(tmp_path), lru_size=0)
+    for worker in range(1, 5):
+        for index in range(40):
+            own, shared = cache.get_many([f"{worker}-{index}", f"shared-{index}"])
+            assert np.array_equal(own, vector(worker * 100 + index))
+            assert np.array_equal(shared, vector(index))
+
+
+def test_interrupted_write_is_dropped_on_open(tmp_path):
+    cache = EmbeddingCache("model", cache_dir=str(tmp_path))
+    cache.put_many(["x"], [vector(1)])
+    # Vector written, key not: a crash between the two appends
+    with open(cache.vectors_path, 'ab') as f:
+        f.write(vector(2).tobytes())
+    with open(cache.keys_path, 'ab') as f:
+        f.write(b"abc")
+
+    reopened = EmbeddingCache("model", cache_dir=str(tmp_path), lru_size=0)
+    reopened.put_many(["y"], [vector(3)])
+    x, y = EmbeddingCache("model", cache_dir=str(tmp_path), lru_size=0).get_many(["x", "y"])
+    assert np.array_equal(x, vector(1))
+    assert np.array_equal(y, vector(3))
@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.incremental_service import IncrementalService
+from app.services.llm_backends import LocalBackend
+from app.services.llm_service import LLMService
+
+
+class FlakyBackend(LocalBackend):
+    """Local backend whose first call on a part containing marker raises"""
+
+    def __init__(self, marker: str):
+        super().__init__()
+        self.marker = marker
+
+    async def complete(self, messages, max_tokens, temperature=0.2):
+        if self.marker and self.marker in messages[-1]["content"]:
+            self.marker = None
+            raise RuntimeError("rate limited")
+        return await super().complete(messages, max_tokens, temperature)
+
+
+def write_issue(pdf_name: str, parts):
+    pdf_dir = os.path.join("app", "utils", pdf_name)
+    os.makedirs(pdf_dir, exist_ok=True)
+    for index, text in enumerate(parts, start=1):
+        with open(os.path.join(pdf_dir, f"part_{index}.txt"), 'w', encoding='utf-8') as f:
+            f.write(f"--- PAGE {index} ---\n{text}\n")
+
+
+@pytest.fixture
+def service_for(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def build(backend):
+        return IncrementalService(None, LLMService(backend, None))
+    return build
+
+
+def summarize(service: IncrementalService, pdf_name: str) -> dict:
+    return asyncio.run(service.summarize(pdf_name))
+
+
+def test_failed_part_is_not_reused_by_the_next_issue(service_for):
+    write_issue("wasde0625", ["Corn ending stocks rise.", "Wheat exports fall."])
+    write_issue("wasde0725", ["Corn ending stocks rise.", "Wheat exports fall."])
+
+    result = summarize(service_for(FlakyBackend("Wheat")), "wasde0625")
+    assert result["parts_failed"] == 1
+    assert "parts" not in service_for(LocalBackend()).load("wasde")
+
+    result = summarize(service_for(LocalBackend()), "wasde0725")
+    assert result["parts_failed"] == 0
+    assert result["parts_reused"] == 0
+    assert "Error summarizing data" not in result["summary"]
+    parts = service_for(LocalBackend()).load("wasde")["parts"]
+    assert len(parts) == 2
+    assert not any(summary.startswith("Error summarizing data") for summary in parts.values())
+
+
+def test_failed_issue_keeps_the_previous_manifest(service_for):
+    write_issue("wasde0525", ["Corn ending stocks rise.", "Wheat exports fall."])
+    write_issue("wasde0625", ["Corn ending stocks rise.", "Wheat exports rise."])
+
+    summarize(service_for(LocalBackend()), "wasde0525")
+    previous = service_for(LocalBackend()).load("wasde")
+
+    result = summarize(service_for(FlakyBackend("Wheat exports rise")), "wasde0625")
+    assert result["parts_failed"] == 1
+    assert result["parts_reused"] == 1
+    assert service_for(LocalBackend()).load("wasde") == previous
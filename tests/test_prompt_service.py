@@ -0,0 +1,38 @@
+from app.services.chat_service import ChatService
+from app.services.prompt_service import PromptPacker
+
+
+class StubVectorService:
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    def semantic_search(self, query, pdf_name=None):
+        return {"success": True, "query": query, "results": {"documents": [self.chunks]}}
+
+
+def words(prefix: str, count: int) -> str:
+    return " ".join(f"{prefix}{index}" for index in range(count))
+
+
+def test_long_previous_reply_leaves_room_for_the_context():
+    chunks = [words(f"chunk{rank}x", 100) for rank in range(3)]
+    chat = ChatService(StubVectorService(chunks), "wasde", PromptPacker("gpt-4o-mini", budget=2000))
+    chat.add_user_message("What is the corn outlook for 2025/26?")
+    chat.add_bot_message(words("reply", 5000))
+
+    chat.add_user_message("and soybeans?")
+    prompt = chat.get_dynamic_prompt("and soybeans?")
+
+    assert "and soybeans?" in prompt
+    assert chat.last_prompt_stats["chunks_used"] >= 1
+    assert chat.last_prompt_stats["prompt_tokens"] <= 2000
+
+
+def test_old_turns_are_truncated_not_summarized():
+    packer = PromptPacker("gpt-4o-mini", budget=4000, recent_turns=1)
+    turns = [("User", words("question", 200)), ("AI", words("answer", 200)), ("User", "latest"), ("AI", "reply")]
+    prompt, stats = packer.pack("query", turns, [], lambda query, history, context: "\n".join(
+        [query, context] + [f"{speaker}: {message}" for speaker, message in history]))
+
+    assert stats["turns_truncated"] == 2
+    assert "question0" in prompt and "question199" not in prompt
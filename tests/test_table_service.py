@@ -0,0 +1,53 @@
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.services.table_service import ColumnarTable, TableParser, TableService, _normalize
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.dirname(__file__)), "test_wasde_pdf", "usgov_wasde.pdf")
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    service = TableService(tables_dir=str(tmp_path_factory.mktemp("tables")))
+    with fitz.open(SAMPLE_PDF) as doc:
+        list(service.extract("wasde", ((index + 1, page.get_text()) for index, page in enumerate(doc))))
+    return service
+
+
+def test_normalize_strips_a_single_plural_s():
+    assert _normalize("Stocks") == "stock"
+    assert _normalize("Loss") == "loss"
+
+
+def test_marketing_year_is_not_a_month(tables):
+    plain = tables.answer("wasde", "corn ending stocks 2025/26")
+    phrased = tables.answer("wasde", "corn ending stocks for marketing year 2025/26")
+    assert plain["success"] and phrased["success"]
+    assert phrased["results"] == plain["results"]
+
+
+@pytest.fixture
+def projections(tmp_path):
+    service = TableService(tables_dir=str(tmp_path))
+    records = [TableParser._record("corn", "United States", "2025/26", "Ending Stocks", variant, "Mil. bu.", value, 12)
+               for variant, value in (("Est.", 1340.0), ("Proj. May", 1800.0), ("Proj. Jun", 1750.0))]
+    service.store("wasde", ColumnarTable.from_records(records))
+    return service
+
+
+def variants_of(service: TableService, question: str):
+    return sorted(cell["variant"] for cell in service.answer("wasde", question)["results"])
+
+
+def test_month_selects_the_projection_column(projections):
+    assert variants_of(projections, "corn ending stocks 2025/26 june") == ["Est.", "Proj. Jun"]
+    assert variants_of(projections, "corn ending stocks 2025/26 may") == ["Est.", "Proj. May"]
+
+
+def test_words_starting_like_a_month_select_no_column(projections):
+    every_column = ["Est.", "Proj. Jun", "Proj. May"]
+    assert variants_of(projections, "corn ending stocks for marketing year 2025/26") == every_column
+    assert variants_of(projections, "will corn ending stocks 2025/26 decrease") == every_column
+    assert variants_of(projections, "corn ending stocks may decline in 2025/26") == every_column